@@ -5,8 +5,12 @@ from sage.structure.sage_object import load
 load('superspace.py')
 
 
-def super_init():
+def super_init(preload=None):
     """Inject the basis and the coeff ring."""
+    r"""
+    The caches are loaded sector by sector when needed; the sectors of
+    the list ``preload`` are loaded at once in a background thread.
+    """
     global QQqta
     global Sym
     global Sparts
@@ -14,6 +18,8 @@ def super_init():
     print("Defining QQqta as " + str(QQqta))
     Sym = SymSuperfunctionsAlgebra(QQqta)
     print("Defining Sym as " + str(Sym))
+    if preload is not None:
+        Sym.preload_caches(preload)
     global p, m, e, h
     p = Sym.Powersum()
     m = Sym.Monomial()
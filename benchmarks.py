@@ -0,0 +1,67 @@
+"""Timings of the different computation engines."""
+r"""
+These functions are meant to be called from a Sage session after
+``load('all.py')``, for instance::
+
+    sage: from benchmarks import bench_TM_inverse
+    sage: bench_TM_inverse(Sym, [(4, 2), (5, 2), (6, 3)])
+
+They print one line per sector and return the timings as a dict.
+"""
+import time
+from superpartition import Superpartitions
+from multimodular import multimodular_inverse
+
+
+def _timed(function, *args, **kwargs):
+    """Return the result of function and the time it took."""
+    start = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - start
+
+
+def bench_TM_inverse(Sym, sectors, processes=None):
+    """Compare the dense and multi-modular inverses of TM_p_to_Schur."""
+    timings = {}
+    print("sector    size     dense   multimod  equal")
+    for sector in sectors:
+        TM = Sym.TM_p_to_Schur(sector)
+        dense, dense_time = _timed(TM.inverse)
+        multi, multi_time = _timed(multimodular_inverse, TM,
+                                   processes=processes, min_size=0)
+        timings[sector] = (dense_time, multi_time)
+        print("{:<9} {:>5} {:>9.3f} {:>9.3f}  {}".format(
+            str(sector), len(list(Superpartitions(*sector))),
+            dense_time, multi_time, dense == multi))
+    return timings
+
+
+def bench_classical_sectors(Sym, which='Jack', max_n=12, min_n=2):
+    """Compare Sage's classical bases with the super engines on (n, 0)."""
+    r"""
+    ``which`` is ``'Jack'``, ``'Macdonald'`` or ``'Schur'``. For each
+    sector `(n, 0)`, the monomial expansions of the whole sector are
+    obtained with ``Sym._classical_to_m`` and with the super Gram-Schmidt
+    (or the Pieri transition matrices for the Schur), and compared.
+    """
+    timings = {}
+    print("sector    size  classical     super  equal")
+    for n in range(min_n, max_n + 1):
+        sector = (n, 0)
+        sparts = list(Superpartitions(*sector))
+        classical, classical_time = _timed(
+            lambda: {spart: Sym._classical_to_m(which, spart)
+                     for spart in sparts})
+        if which == 'Schur':
+            rows, super_time = _timed(Sym._Schur_m_sector, sector)
+        else:
+            basis = {'Jack': Sym._Jack, 'Macdonald': Sym._Macdo}[which]
+            rows, super_time = _timed(basis._gram_sector, *sector)
+        equal = all(
+            {key: coeff for key, coeff in rows[spart].items()
+             if coeff != 0} == classical[spart]
+            for spart in sparts)
+        timings[sector] = (classical_time, super_time)
+        print("{:<9} {:>5} {:>9.3f} {:>9.3f}  {}".format(
+            str(sector), len(sparts), classical_time, super_time, equal))
+    return timings
@@ -0,0 +1,442 @@
+"""Disk storage of the monomial expansion caches."""
+r"""
+Each cache {sector: {spart: {spart: coeff}}} (``Jack_m``, ``Macdo_m``,
+``Schur_m``, ``SchurBar_m``, the names of the Jack and Macdonald caches
+carrying their base ring and parameters) is stored in the directory
+``./super_cache/<name>/``, one file ``sector_<n>_<m>.sobj`` per sector
+with a small manifest ``manifest.json`` listing the sectors and their
+number of rows. Every file is written to a temporary file which is then
+renamed, so that a crash leaves the previous version of the file, and
+adding a sector costs the writing of this sector (and of the manifest)
+only.
+
+The rows computed one by one are appended to the journal
+``sector_<n>_<m>.rows`` of their sector by a ``RowSink`` as soon as they
+are known, and merged in the sector file when the sink is closed. After
+a crash, the journal is replayed the next time the sector is loaded.
+
+The caches of the older versions, one file ``./super_cache/<name>.sobj``
+for all the sectors, are split in sector files the first time they are
+loaded.
+
+The algebra does not load its caches when it is built: a ``LazyCache``
+only reads the manifest, and each sector is unpickled the first time it
+is looked up. ``LazyCache.preload`` loads some sectors in a background
+thread.
+
+Several processes may share a cache directory, given by the argument
+``directory`` or else the environment variable ``SUPER_CACHE_DIR``.
+Each sector, and the manifest, has an advisory lock file
+``<sector or manifest>.lock``: the process computing a sector holds its
+lock, the others wait for it and then read the rows it wrote. Writing a
+sector, or the manifest, merges the version on disk with the new rows
+under the lock, so that concurrent additions are all kept.
+
+With a ``CoefficientDecoder``, the sector files and journals hold the
+plain encoding of ``coefficient_codec.py`` instead of pickled Sage
+objects, and each sector is decoded in the base ring of the algebra once,
+when it is loaded. The files of the previous format are still read. The
+compact stores (the Jack and Macdonald caches) write each row over the
+common denominator of its coefficients and keep the sectors encoded in
+memory, in a ``CompactSector`` decoding a row when it is looked up.
+"""
+import os
+import re
+import json
+import pickle
+import threading
+from sage.structure.sage_object import load, save
+from coefficient_codec import (encode_rows, encode_row, encode_compact_row,
+                               encode_spart, decode_spart, is_encoded,
+                               CompactSector)
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+try:
+    import fcntl
+except ImportError:
+    # Without fcntl, the locks only hold between threads
+    fcntl = None
+
+_SECTOR_FILE = re.compile(r'^sector_(\d+)_(\d+)\.(sobj|rows)$')
+
+
+def cache_root():
+    """Return the default directory of the caches."""
+    return os.environ.get('SUPER_CACHE_DIR', './super_cache')
+
+
+def _atomic_save(obj, tmp, filename):
+    """Save obj in tmp.sobj, then rename it filename.sobj."""
+    save(obj, filename=tmp + '.tmp')
+    os.rename(tmp + '.tmp.sobj', filename + '.sobj')
+
+
+class FileLock(object):
+    """A reentrant lock between the threads and processes."""
+
+    def __init__(self, path):
+        """Initialize the lock of the file path."""
+        self._path = path
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def acquire(self):
+        """Wait for the lock."""
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            self._file = open(self._path, 'a')
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+
+    def release(self):
+        """Release the lock."""
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class CacheStore(object):
+    """The files of one cache."""
+
+    def __init__(self, name, directory=None, legacy=None, decoder=None,
+                 compact=False):
+        """Initialize the store of the cache called name."""
+        r"""
+        ``directory`` defaults to ``cache_root()``. ``legacy`` is the
+        name of the single file cache of the older versions which is
+        split in this store, if any. ``decoder`` is the
+        ``CoefficientDecoder`` of the rows, without which they are
+        pickled as they are. With ``compact``, and a decoder, the rows
+        are written over a common denominator and kept encoded.
+        """
+        if directory is None:
+            directory = cache_root()
+        self.name = name
+        self._directory = os.path.join(directory, name)
+        self._manifest = os.path.join(self._directory, 'manifest.json')
+        self._legacy = None
+        if legacy is not None:
+            self._legacy = os.path.join(directory, legacy)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._decoder = decoder
+        self._compact = compact and decoder is not None
+
+    def _filename(self, sector):
+        """Return the file name of sector, without the extension."""
+        return os.path.join(self._directory,
+                            'sector_{}_{}'.format(*sector))
+
+    def journal(self, sector):
+        """Return the file name of the journal of sector."""
+        return self._filename(sector) + '.rows'
+
+    def _makedirs(self):
+        if not os.path.isdir(self._directory):
+            try:
+                os.makedirs(self._directory)
+            except OSError:
+                # Created by another process in the meantime
+                if not os.path.isdir(self._directory):
+                    raise
+
+    def lock(self, sector=None):
+        """Return the FileLock of sector, or of the manifest."""
+        key = 'manifest' if sector is None else 'sector_{}_{}'.format(
+            *sector)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._makedirs()
+                self._locks[key] = FileLock(
+                    os.path.join(self._directory, key + '.lock'))
+            return self._locks[key]
+
+    def manifest(self):
+        """Return the dict {sector: number of rows} of the manifest."""
+        try:
+            with open(self._manifest) as manifest:
+                entries = json.load(manifest)['sectors']
+        except (IOError, OSError, ValueError, KeyError):
+            return {}
+        return {(n, m): rows for n, m, rows in entries}
+
+    def _write_manifest(self, manifest):
+        tmp = '{}.{}.tmp'.format(self._manifest, os.getpid())
+        with open(tmp, 'w') as out:
+            json.dump({'sectors': [[n, m, rows] for (n, m), rows
+                                   in sorted(manifest.items())]}, out)
+        os.rename(tmp, self._manifest)
+
+    def sectors(self):
+        """Return the sorted list of the sectors in the store."""
+        sectors = set(self.manifest())
+        if os.path.isdir(self._directory):
+            # The files written after the manifest by an interrupted run
+            for filename in os.listdir(self._directory):
+                match = _SECTOR_FILE.match(filename)
+                if match:
+                    sectors.add((int(match.group(1)), int(match.group(2))))
+        return sorted(sectors)
+
+    def load(self):
+        """Return the cache, with the rows of the journals."""
+        self._split_legacy()
+        return {sector: self.load_sector(sector)
+                for sector in self.sectors()}
+
+    def _read_sector(self, sector):
+        """Return the rows of the file of sector."""
+        filename = self._filename(sector)
+        if not os.path.exists(filename + '.sobj'):
+            return {}
+        data = load(filename)
+        if is_encoded(data):
+            if self._decoder is None:
+                raise ValueError("The cache " + self.name + " is encoded, "
+                                 "a decoder is needed.")
+            data = self._decoder.rows(data)
+        if self._compact and not isinstance(data, CompactSector):
+            # A sector of a previous format, compacted when written
+            rows = CompactSector(self._decoder, [])
+            rows.merge(data)
+            return rows
+        return data
+
+    def load_sector(self, sector):
+        """Return the rows of sector, with the rows of its journal."""
+        if not os.path.exists(self.journal(sector)):
+            return self._read_sector(sector)
+        with self.lock(sector):
+            rows = self._read_sector(sector)
+            if self._replay(sector, rows):
+                self._write_sector(sector, rows)
+            else:
+                # Nothing but a record cut by a crash
+                os.remove(self.journal(sector))
+            return rows
+
+    def _replay(self, sector, rows):
+        """Add the rows of the journal of sector, return their number."""
+        journal_name = self.journal(sector)
+        if not os.path.exists(journal_name):
+            return 0
+        replayed = 0
+        with open(journal_name, 'rb') as journal:
+            while True:
+                try:
+                    record = pickle.load(journal)
+                except Exception:
+                    # The end, or a row cut by a crash
+                    break
+                if len(record) == 3:
+                    spart = decode_spart(record[1])
+                    rows[spart] = self._decoder.row(record[2])
+                else:
+                    spart, row = record
+                    rows[spart] = row
+                replayed += 1
+        return replayed
+
+    def _split_legacy(self):
+        """Split the single file cache of the older versions, once."""
+        if (self._legacy is None or os.path.exists(self._manifest) or
+                not os.path.exists(self._legacy + '.sobj')):
+            return
+        with self.lock():
+            if os.path.exists(self._manifest):
+                # Split by another process while we waited
+                return
+            try:
+                cache = load(self._legacy)
+            except Exception:
+                return
+            for sector, rows in cache.items():
+                self.save_sector(sector, rows)
+            if not cache:
+                self._write_manifest({})
+
+    def save_sector(self, sector, rows):
+        """Add the rows of sector to its file and empty its journal."""
+        with self.lock(sector):
+            merged = self._read_sector(sector)
+            if isinstance(merged, CompactSector):
+                merged.merge(rows)
+            else:
+                merged.update(rows)
+            self._write_sector(sector, merged)
+
+    def _write_sector(self, sector, rows):
+        """Write the file of sector, under its lock."""
+        self._makedirs()
+        data = rows
+        if self._decoder is not None:
+            data = encode_rows(rows, self._compact)
+        _atomic_save(data, '{}.{}'.format(self._filename(sector),
+                                          os.getpid()),
+                     self._filename(sector))
+        with self.lock():
+            manifest = self.manifest()
+            manifest[sector] = len(rows)
+            self._write_manifest(manifest)
+        if os.path.exists(self.journal(sector)):
+            os.remove(self.journal(sector))
+
+    def save(self, cache):
+        """Write every sector of the cache."""
+        for sector, rows in cache.items():
+            self.save_sector(sector, rows)
+
+    def journal_record(self, spart, row):
+        """Return the record of a row in a journal."""
+        if self._decoder is None:
+            return (spart, row)
+        if self._compact:
+            return ('row', encode_spart(spart), encode_compact_row(row))
+        return ('row', encode_spart(spart), encode_row(row))
+
+    def sink(self, cache, sector):
+        """Return a RowSink writing the rows of sector in cache."""
+        return RowSink(self, cache, sector)
+
+    def lazy_load(self):
+        """Return the cache as a LazyCache, reading only the index."""
+        self._split_legacy()
+        return LazyCache(self)
+
+
+class LazyCache(MutableMapping):
+    """A cache {sector: rows} whose sectors are loaded when looked up."""
+
+    def __init__(self, store):
+        """Initialize the cache of store, without loading any sector."""
+        self._store = store
+        self._loaded = {}
+        self._pending = set(store.sectors())
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "Lazy cache {} ({} sectors, {} loaded)".format(
+            self._store.name, len(self), len(self._loaded))
+
+    def __contains__(self, sector):
+        return sector in self._loaded or sector in self._pending
+
+    def __getitem__(self, sector):
+        if sector not in self._loaded:
+            with self._lock:
+                # The sector may have been loaded by another thread
+                if sector in self._pending:
+                    self._loaded[sector] = self._store.load_sector(sector)
+                    self._pending.discard(sector)
+        return self._loaded[sector]
+
+    def __setitem__(self, sector, rows):
+        with self._lock:
+            self._pending.discard(sector)
+            self._loaded[sector] = rows
+
+    def __delitem__(self, sector):
+        with self._lock:
+            if sector in self._pending:
+                self._pending.discard(sector)
+            else:
+                del self._loaded[sector]
+
+    def __iter__(self):
+        return iter(sorted(set(self._loaded) | self._pending))
+
+    def __len__(self):
+        return len(self._loaded) + len(self._pending)
+
+    def refresh(self, sector):
+        """Merge the rows of sector written by other processes."""
+        rows = self._store.load_sector(sector)
+        with self._lock:
+            if sector in self._loaded:
+                current = self._loaded[sector]
+                # Only the missing rows are decoded
+                for spart in rows:
+                    if spart not in current:
+                        current[spart] = rows[spart]
+            elif rows or sector in self._pending:
+                self._loaded[sector] = rows
+            self._pending.discard(sector)
+
+    def is_loaded(self, sector):
+        """Return whether the rows of sector are in memory."""
+        return sector in self._loaded
+
+    def preload(self, sectors=None, background=True):
+        """Load sectors (all of them by default), in a thread if asked."""
+        r"""
+        Return the thread, which is a daemon, or ``None`` if the sectors
+        were loaded in the calling thread. The sectors which are not in
+        the cache are ignored.
+        """
+        if sectors is None:
+            sectors = list(self._pending)
+
+        def _load():
+            for sector in sectors:
+                if sector in self:
+                    self[sector]
+        if not background:
+            _load()
+            return None
+        thread = threading.Thread(target=_load)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+class RowSink(object):
+    """Write the rows of a sector to a cache as they are computed."""
+
+    def __init__(self, store, cache, sector):
+        """Initialize the sink of sector, cache being the dict in memory."""
+        self._store = store
+        self._rows = cache.setdefault(sector, {})
+        self.sector = sector
+        self._journal = None
+
+    def write(self, spart, row):
+        """Add the row of spart to the cache and to the journal."""
+        self._rows[spart] = row
+        if self._journal is None:
+            self._store._makedirs()
+            self._journal = open(self._store.journal(self.sector), 'ab')
+        pickle.dump(self._store.journal_record(spart, row), self._journal,
+                    pickle.HIGHEST_PROTOCOL)
+        self._journal.flush()
+
+    def consume(self, rows):
+        """Write the pairs (spart, row) of rows, yielding them on the fly."""
+        for spart, row in rows:
+            self.write(spart, row)
+            yield spart, row
+
+    def close(self):
+        """Close the journal and write the rows to the sector file."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            self._store.save_sector(self.sector, self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
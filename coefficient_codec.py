@@ -0,0 +1,325 @@
+"""Binary encoding of the rows of the caches."""
+r"""
+The rows {spart: {spart: coeff}} of the caches are written with plain
+Python objects only:
+
+- a superpartition is the pair of tuples of its fermionic and bosonic
+  parts;
+- a rational coefficient is ``('q', numerator, denominator)``;
+- a rational function is ``('f', names, numerator, denominator)``, each
+  polynomial being the three arrays (exponent tuples, numerators,
+  denominators) of its terms over `\QQ` in the variables ``names``;
+- anything else is ``('s', string)``, which is the only case parsed.
+
+The rows of the Jack and Macdonald caches, whose denominators are
+products of a few hook factors shared by the whole row, may instead be
+written in the compact form ``('r', names, denominator, numerators)``:
+the coefficients are brought to the lcm of their denominators and scaled
+to integer coefficients, and every polynomial is packed as the flat array
+of the exponents of its terms and the array of their integer
+coefficients. The sectors of this format are kept encoded in memory, in
+a ``CompactSector``, and a row is decoded only when it is looked up.
+
+A ``CoefficientDecoder`` rebuilds the coefficients in the base ring of an
+algebra: each polynomial is built at once from the dict of its terms,
+the variables being matched by name (and replaced by their values when
+the algebra specializes them).
+"""
+from array import array
+from sage.rings.fraction_field import FractionField_generic
+from sage.rings.rational_field import QQ
+from sage.arith.all import lcm
+from superpartition import _Superpartitions
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+FORMAT = ('coefficients', 1)
+COMPACT_FORMAT = ('coefficients', 2)
+# Type and bound of the packed integers
+_INT_TYPE = 'l'
+_INT_BOUND = 2**(8 * array(_INT_TYPE).itemsize - 1)
+
+
+def encode_spart(spart):
+    """Return the pair of tuples of the parts of spart."""
+    return (tuple(int(part) for part in spart[0]),
+            tuple(int(part) for part in spart[1]))
+
+
+def decode_spart(data):
+    """Return the superpartition of an encoded pair."""
+    return _Superpartitions([list(data[0]), list(data[1])])
+
+
+def _encode_polynomial(poly, names):
+    """Return the arrays (exponents, numerators, denominators) of poly."""
+    exps, nums, dens = [], [], []
+    for exp, coeff in poly.dict().items():
+        if len(names) == 1 and not isinstance(exp, tuple):
+            exp = (exp,)
+        exps.append(tuple(int(e) for e in exp))
+        nums.append(int(coeff.numerator()))
+        dens.append(int(coeff.denominator()))
+    return exps, nums, dens
+
+
+def encode_coefficient(coeff):
+    """Return the plain encoding of a coefficient."""
+    parent = getattr(coeff, 'parent', None)
+    if parent is None:
+        # A Python integer
+        return ('q', int(coeff), 1)
+    ring = parent()
+    try:
+        if isinstance(ring, FractionField_generic):
+            num, den = coeff.numerator(), coeff.denominator()
+        elif hasattr(coeff, 'dict'):
+            # A polynomial
+            num, den = coeff, ring.one()
+        else:
+            if ring.characteristic() == 0:
+                return ('q', int(coeff.numerator()),
+                        int(coeff.denominator()))
+            return ('q', int(coeff), 1)
+        names = tuple(num.parent().variable_names())
+        return ('f', names, _encode_polynomial(num, names),
+                _encode_polynomial(den, names))
+    except (AttributeError, TypeError, ValueError, NotImplementedError):
+        return ('s', str(coeff))
+
+
+def encode_row(row):
+    """Return the list of the encoded pairs (spart, coeff) of a row."""
+    return [(encode_spart(spart), encode_coefficient(coeff))
+            for spart, coeff in row.items()]
+
+
+def _pack(values):
+    """Return an array of the integers values, or their tuple if too big."""
+    if all(-_INT_BOUND <= value < _INT_BOUND for value in values):
+        return array(_INT_TYPE, values)
+    return tuple(values)
+
+
+def _pack_polynomial(poly, nvars):
+    """Return the packed (exponents, coefficients) of an integral poly."""
+    exps, coeffs = [], []
+    for exp, coeff in poly.dict().items():
+        if nvars == 1 and not isinstance(exp, tuple):
+            exp = (exp,)
+        exps.extend(int(e) for e in exp)
+        coeffs.append(int(coeff))
+    return _pack(exps), _pack(coeffs)
+
+
+def encode_compact_row(row):
+    """Return the row over the common denominator of its coefficients."""
+    r"""
+    The coefficients must be in a fraction field of polynomials over
+    `\QQ`, otherwise the row is encoded as by ``encode_row``.
+    """
+    # The integers (such as a leading coefficient 1) are left out
+    fields = set(coeff.parent() for coeff in row.values()
+                 if hasattr(coeff, 'parent') and
+                 isinstance(coeff.parent(), FractionField_generic))
+    if len(fields) != 1:
+        return encode_row(row)
+    field = fields.pop()
+    R = field.ring()
+    if R.base_ring() is not QQ:
+        return encode_row(row)
+    try:
+        row = {spart: field(coeff) for spart, coeff in row.items()
+               if coeff != 0}
+    except (TypeError, ValueError):
+        return encode_row(row)
+    den = lcm([coeff.denominator() for coeff in row.values()])
+    nums = {}
+    for spart, coeff in row.items():
+        scaled = coeff * den
+        # The denominator of scaled is a constant
+        nums[spart] = scaled.numerator() / \
+            scaled.denominator().constant_coefficient()
+    # Integer coefficients everywhere
+    scale = lcm([c.denominator() for poly in list(nums.values()) + [den]
+                 for c in poly.coefficients()] + [1])
+    names = tuple(R.variable_names())
+    nvars = len(names)
+    R_den = R(den * scale)
+    return ('r', names, _pack_polynomial(R_den, nvars),
+            [(encode_spart(spart), _pack_polynomial(R(num * scale), nvars))
+             for spart, num in nums.items()])
+
+
+def encode_rows(rows, compact=False):
+    """Return the encoding of the rows of a sector."""
+    if compact:
+        if isinstance(rows, CompactSector):
+            return COMPACT_FORMAT + (list(rows.encoded_items()),)
+        return COMPACT_FORMAT + ([(encode_spart(spart),
+                                   encode_compact_row(row))
+                                  for spart, row in rows.items()],)
+    return FORMAT + ([(encode_spart(spart), encode_row(row))
+                      for spart, row in rows.items()],)
+
+
+def is_encoded(data):
+    """Return whether data was written by encode_rows."""
+    return isinstance(data, tuple) and data[:2] in [FORMAT, COMPACT_FORMAT]
+
+
+class CoefficientDecoder(object):
+    """Rebuild encoded coefficients in a base ring."""
+
+    def __init__(self, ring, values=None):
+        """Initialize the decoder to ring, values giving fixed variables."""
+        self._ring = ring
+        self._poly_ring = None
+        if isinstance(ring, FractionField_generic):
+            self._poly_ring = ring.ring()
+        # The terms are computed in the coefficients of the polynomials
+        self._base = ring
+        if self._poly_ring is not None:
+            self._base = self._poly_ring.base_ring()
+        self._values = {name: self._base(value)
+                        for name, value in (values or {}).items()}
+        # By tuple of names: positions in the polynomial ring, or None
+        self._positions = {}
+
+    def _layout(self, names):
+        """Return the positions of names in the polynomial ring."""
+        if names not in self._positions:
+            ring_names = ()
+            if self._poly_ring is not None:
+                ring_names = tuple(self._poly_ring.variable_names())
+            self._positions[names] = [
+                ring_names.index(name) if name in ring_names else None
+                for name in names]
+        return self._positions[names]
+
+    def _polynomial(self, names, terms):
+        """Return the polynomial of the encoded terms in the ring."""
+        positions = self._layout(names)
+        ngens = 0 if self._poly_ring is None else self._poly_ring.ngens()
+        out = {}
+        constant = self._ring.zero()
+        for exp, num, den in zip(*terms):
+            coeff = self._base(num) / den
+            new_exp = [0] * ngens
+            for name, pos, e in zip(names, positions, exp):
+                if e == 0:
+                    continue
+                if pos is None:
+                    if name not in self._values:
+                        raise ValueError("The variable " + name +
+                                         " is not in " + str(self._ring))
+                    coeff *= self._values[name]**e
+                else:
+                    new_exp[pos] = e
+            if ngens == 0:
+                constant += coeff
+            else:
+                key = new_exp[0] if ngens == 1 else tuple(new_exp)
+                out[key] = out.get(key, 0) + coeff
+        if ngens == 0:
+            return constant
+        return self._ring(self._poly_ring(out))
+
+    def __call__(self, data):
+        """Return the coefficient of its encoding."""
+        if data[0] == 'q':
+            return self._ring(data[1]) / self._ring(data[2])
+        if data[0] == 'f':
+            names = data[1]
+            return (self._polynomial(names, data[2]) /
+                    self._polynomial(names, data[3]))
+        return self._ring(data[1])
+
+    def _unpack(self, names, packed):
+        """Return the polynomial of packed (exponents, coefficients)."""
+        exps, coeffs = packed
+        nvars = len(names)
+        terms = ([tuple(exps[k*nvars:(k+1)*nvars])
+                  for k in range(len(coeffs))],
+                 coeffs, [1] * len(coeffs))
+        return self._polynomial(names, terms)
+
+    def row(self, data):
+        """Return the row {spart: coeff} of an encoded row."""
+        if isinstance(data, tuple) and data[0] == 'r':
+            names = data[1]
+            den = self._unpack(names, data[2])
+            return {decode_spart(spart): self._unpack(names, num) / den
+                    for spart, num in data[3]}
+        return {decode_spart(spart): self(coeff) for spart, coeff in data}
+
+    def rows(self, data):
+        """Return the rows of a sector written by encode_rows."""
+        if data[:2] == COMPACT_FORMAT:
+            return CompactSector(self, data[2])
+        return {decode_spart(spart): self.row(row) for spart, row in data[2]}
+
+
+class CompactSector(MutableMapping):
+    """The rows {spart: row} of a sector, kept encoded."""
+    r"""
+    The rows read from a file stay in their compact encoding and are
+    decoded each time they are looked up; the rows added in memory are
+    kept as they are, and encoded when the sector is written.
+    """
+
+    def __init__(self, decoder, entries):
+        """Initialize from the list of (encoded spart, compact row)."""
+        self._decoder = decoder
+        self._encoded = {decode_spart(spart): (spart, row)
+                         for spart, row in entries}
+        self._rows = {}
+
+    def __repr__(self):
+        return "Compact sector ({} rows)".format(len(self))
+
+    def __contains__(self, spart):
+        return spart in self._rows or spart in self._encoded
+
+    def __getitem__(self, spart):
+        if spart in self._rows:
+            return self._rows[spart]
+        return self._decoder.row(self._encoded[spart][1])
+
+    def __setitem__(self, spart, row):
+        self._encoded.pop(spart, None)
+        self._rows[spart] = row
+
+    def __delitem__(self, spart):
+        if spart in self._rows:
+            del self._rows[spart]
+        else:
+            del self._encoded[spart]
+
+    def __iter__(self):
+        for spart in self._encoded:
+            yield spart
+        for spart in self._rows:
+            yield spart
+
+    def __len__(self):
+        return len(self._encoded) + len(self._rows)
+
+    def merge(self, rows):
+        """Add rows, without decoding them if they are compact."""
+        if isinstance(rows, CompactSector):
+            for spart, entry in rows._encoded.items():
+                self._rows.pop(spart, None)
+                self._encoded[spart] = entry
+            rows = rows._rows
+        for spart, row in rows.items():
+            self[spart] = row
+
+    def encoded_items(self):
+        """Yield the pairs (encoded spart, compact row) of the sector."""
+        for entry in self._encoded.values():
+            yield entry
+        for spart, row in self._rows.items():
+            yield encode_spart(spart), encode_compact_row(row)
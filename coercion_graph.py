@@ -0,0 +1,80 @@
+"""Graph of the morphisms between the bases of the algebra."""
+r"""
+Every morphism registered as a coercion in ``SymSuperfunctionsAlgebra``
+is recorded as an edge between the names of the two realizations (for
+instance ``'Powersum'`` and ``'Monomial'``). The graph is used to
+assemble sector transition matrices between any pair of bases by
+composing the matrices of the edges along a path. The path is the
+cheapest one for a cost function of the edges, usually the estimated
+time of building and applying the edge matrices for a given sector.
+
+An edge carries
+
+- ``morphism`` -- the Sage morphism, if any
+- ``matrix`` -- a function of the sector returning the transition
+  matrix of the edge, when the algebra already caches it
+- ``inverse_of`` -- ``True`` if the edge is the inverse of the edge in
+  the opposite direction, its matrix is then obtained by inversion
+"""
+import heapq
+
+
+class CoercionGraph(object):
+    """Directed graph whose vertices are names of bases."""
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        self._edges = {}
+
+    def add_edge(self, source, target, **edge_data):
+        """Add the edge source -> target with its data."""
+        self._edges.setdefault(source, {})
+        self._edges.setdefault(target, {})
+        self._edges[source][target] = edge_data
+
+    def edge(self, source, target):
+        """Return the data of the edge source -> target."""
+        return self._edges[source][target]
+
+    def vertices(self):
+        """Return the names of the bases in the graph."""
+        return list(self._edges.keys())
+
+    def neighbours(self, source):
+        """Return the names of the bases reachable in one step."""
+        return list(self._edges.get(source, {}).keys())
+
+    def cheapest_path(self, source, target, cost):
+        """Return (path, total cost) minimizing the sum of cost(u, v)."""
+        r"""
+        This is Dijkstra's algorithm, ``cost`` being a function of the
+        two ends of an edge returning a nonnegative number.
+        """
+        if source == target:
+            return [source], 0
+        best = {source: 0}
+        previous = {source: None}
+        done = set()
+        # The counter breaks ties without comparing the names
+        heap = [(0, 0, source)]
+        counter = 1
+        while heap:
+            dist, _, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            if current == target:
+                path = [target]
+                while previous[path[-1]] is not None:
+                    path.append(previous[path[-1]])
+                path.reverse()
+                return path, dist
+            done.add(current)
+            for nxt in self.neighbours(current):
+                new_dist = dist + cost(current, nxt)
+                if nxt not in best or new_dist < best[nxt]:
+                    best[nxt] = new_dist
+                    previous[nxt] = current
+                    heapq.heappush(heap, (new_dist, counter, nxt))
+                    counter += 1
+        raise ValueError("No conversion from " + str(source) +
+                         " to " + str(target) + ".")
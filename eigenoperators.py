@@ -0,0 +1,160 @@
+"""The Jack operators D and Delta on the powersum and monomial bases."""
+r"""
+The Jack superpolynomials are the common eigenfunctions of the operators
+of ``superspace.Djack`` and ``superspace.DeltaJack``
+
+.. MATH::
+
+    D = \frac{\alpha}{2} \sum_i x_i^2 \partial_{x_i}^2
+    + \sum_{i \neq j} \frac{x_i x_j}{x_i - x_j} \partial_{x_i}
+    - \sum_{i \neq j} \frac{x_i x_j (\theta_i - \theta_j)}{(x_i - x_j)^2}
+    \partial_{\theta_i},
+
+    \Delta = \alpha \sum_i x_i \theta_i \partial_{x_i}\partial_{\theta_i}
+    + \sum_{i \neq j} \frac{x_i \theta_j + x_j \theta_i}{x_i - x_j}
+    \partial_{\theta_i}.
+
+Written with the power sums `p_n = \sum_i x_i^n` and
+`\tilde p_n = \sum_i \theta_i x_i^n`, they do not depend on the number of
+variables:
+
+.. MATH::
+
+    D = \frac{\alpha}{2} \Big( \sum_{n} n(n-1) (p_n \partial_{p_n}
+    + \tilde p_n \partial_{\tilde p_n})
+    + \sum_{n, m} nm\, p_{n+m} \partial_{p_n} \partial_{p_m}
+    + 2 \sum_{n, m} nm\, \tilde p_{n+m} \partial_{p_n}
+    \partial_{\tilde p_m} \Big)
+    + \sum_n \frac{n}{2} \sum_{a=1}^{n-1} (p_a p_{n-a} - p_n)
+    \partial_{p_n}
+    + \sum_n \sum_{a=1}^{n-1} a (\tilde p_a p_{n-a} - \tilde p_n)
+    \partial_{\tilde p_n},
+
+    \Delta = \alpha \Big( \sum_n n \tilde p_n \partial_{\tilde p_n}
+    + \sum_{n, m} n\, \tilde p_{n+m} \partial_{p_n}
+    \partial_{\tilde p_m} \Big)
+    + \sum_n \sum_{a=0}^{n-1} (\tilde p_a p_{n-a} - \tilde p_n)
+    \partial_{\tilde p_n}.
+
+Both operators are even, so that every term replaces factors of `p_\Lambda`
+in place, and the signs are those of the product of the powersum basis.
+Conjugated by the transition matrices, they are triangular on the
+monomial basis, and the Jack superpolynomials are obtained by
+back-substitution, with `\Delta` used where the spectrum of `D` is
+degenerate.
+"""
+from sage.rings.rational_field import QQ
+from superpartition import _Superpartitions
+
+
+def _product(fermions, bosons):
+    """Return (sign, spart) of the product of the powersum generators."""
+    sign = 1
+    spart = _Superpartitions([[], []])
+    for part in fermions:
+        factor_sign, spart = spart + _Superpartitions([[part], []])
+        sign *= factor_sign
+        if sign == 0:
+            return 0, None
+    bosons = sorted(bosons, reverse=True)
+    return sign, (spart + _Superpartitions([[], bosons]))[1]
+
+
+class _Expansion(object):
+    """Accumulate the terms of an operator applied on p_Lambda."""
+
+    def __init__(self, spart):
+        self.fermions = list(spart[0])
+        self.bosons = list(spart[1])
+        self._sign = _product(self.fermions, self.bosons)[0]
+        self.terms = {}
+
+    def add(self, coeff, fermions, bosons):
+        """Add coeff times the product of the generators."""
+        sign, spart = _product(fermions, bosons)
+        if sign == 0 or coeff == 0:
+            return
+        value = self.terms.get(spart, 0) + coeff * sign * self._sign
+        if value == 0:
+            self.terms.pop(spart, None)
+        else:
+            self.terms[spart] = value
+
+    def merge_boson_fermion(self, coeff):
+        """Add the terms p~_(n+m) d_(p_n) d_(p~_m) times coeff(n, m)."""
+        for i, n in enumerate(self.bosons):
+            bosons = self.bosons[:i] + self.bosons[i+1:]
+            for k, m in enumerate(self.fermions):
+                fermions = list(self.fermions)
+                fermions[k] = n + m
+                self.add(coeff(n, m), fermions, bosons)
+
+    def split_fermions(self, start, coeff):
+        """Add the terms p~_a p_(n-a) d_(p~_n) times coeff(a), a >= start."""
+        for k, n in enumerate(self.fermions):
+            for a in range(start, n):
+                fermions = list(self.fermions)
+                fermions[k] = a
+                self.add(coeff(a), fermions, self.bosons + [n - a])
+
+
+def D_on_powersum(spart, alpha):
+    """Return the dict {spart: coeff} of D applied on p_spart."""
+    expansion = _Expansion(spart)
+    fermions, bosons = expansion.fermions, expansion.bosons
+    # The diagonal terms, including the -p_n parts of the splittings
+    diagonal = (alpha - 1) / 2 * sum(n * (n - 1) for n in fermions + bosons)
+    expansion.add(diagonal, fermions, bosons)
+    for i in range(len(bosons)):
+        for j in range(i + 1, len(bosons)):
+            others = [bosons[k] for k in range(len(bosons))
+                      if k not in (i, j)]
+            expansion.add(alpha * bosons[i] * bosons[j], fermions,
+                          others + [bosons[i] + bosons[j]])
+    expansion.merge_boson_fermion(lambda n, m: alpha * n * m)
+    for i, n in enumerate(bosons):
+        others = bosons[:i] + bosons[i+1:]
+        for a in range(1, n):
+            expansion.add(QQ(n) / 2, fermions, others + [a, n - a])
+    expansion.split_fermions(1, lambda a: a)
+    return expansion.terms
+
+
+def Delta_on_powersum(spart, alpha):
+    """Return the dict {spart: coeff} of Delta applied on p_spart."""
+    expansion = _Expansion(spart)
+    fermions, bosons = expansion.fermions, expansion.bosons
+    expansion.add((alpha - 1) * sum(fermions), fermions, bosons)
+    expansion.merge_boson_fermion(lambda n, m: alpha * n)
+    expansion.split_fermions(0, lambda a: 1)
+    return expansion.terms
+
+
+def eigen_row(spart, down_set, D_cols, Delta_cols, one):
+    """Return the coefficients of the Jack of spart on the monomials."""
+    r"""
+    ``down_set`` lists the superpartitions dominated by ``spart``, in
+    increasing order, and ``D_cols``, ``Delta_cols`` are the operators on
+    the monomial basis as dicts {column: {row: coeff}}, the image of
+    `m_\Omega` being `\sum_\Gamma d_{\Omega\Gamma} m_\Gamma`. ``one``
+    is the leading coefficient, the unit of the base ring.
+    """
+    eigen_D = D_cols[spart].get(spart, 0)
+    eigen_Delta = Delta_cols[spart].get(spart, 0)
+    coeffs = {spart: one}
+    for other in reversed(down_set):
+        gap = eigen_D - D_cols[other].get(other, 0)
+        cols = D_cols
+        if gap == 0:
+            # D is degenerate, Delta separates the two superpartitions
+            gap = eigen_Delta - Delta_cols[other].get(other, 0)
+            cols = Delta_cols
+            if gap == 0:
+                raise ValueError("The spectrum of D and Delta is "
+                                 "degenerate.")
+        rhs = 0
+        for upper, coeff in cols[other].items():
+            if upper in coeffs and upper != other:
+                rhs += coeffs[upper] * coeff
+        coeffs[other] = rhs / gap
+    return coeffs
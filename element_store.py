@@ -0,0 +1,153 @@
+"""Storage of the orthogonal vectors of a Gram-Schmidt run."""
+r"""
+``SectorGramSchmidt`` keeps every orthogonal vector as its superpartition,
+its coordinates on the source and powersum bases and its norm. The
+``ElementStore`` keeps them in memory. The ``DiskElementStore`` appends
+the two coordinate dicts of each vector to a file, keeps only the
+superpartitions, norms and file offsets in memory, and reads the file
+through a memory map: the powersum coordinates are paged in (and kept in
+a small LRU cache) for the scalar products that are actually computed,
+and the source coordinates only when the projection does not vanish.
+
+Both can give their state, which is small for the disk store, so that a
+run may be checkpointed and resumed.
+"""
+import os
+import mmap
+import pickle
+from structure_constants import LRUCache
+
+
+class ElementStore(object):
+    """Orthogonal vectors kept in memory."""
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self._elements = []
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __getitem__(self, j):
+        """Return the tuple (spart, source coords, p coords, norm)."""
+        return self._elements[j]
+
+    def append(self, spart, in_src, in_p, norm):
+        """Store a new vector."""
+        self._elements.append((spart, in_src, in_p, norm))
+
+    def spart(self, j):
+        """Return the superpartition of the vector j."""
+        return self._elements[j][0]
+
+    def source(self, j):
+        """Return the coordinates of the vector j on the source basis."""
+        return self._elements[j][1]
+
+    def powersums(self, j):
+        """Return the coordinates of the vector j on the powersums."""
+        return self._elements[j][2]
+
+    def norm(self, j):
+        """Return the norm of the vector j."""
+        return self._elements[j][3]
+
+    def state(self):
+        """Return what is needed to restore the store."""
+        return list(self._elements)
+
+    def restore(self, state):
+        """Restore the vectors of a state."""
+        self._elements = list(state)
+
+    def close(self, remove=False):
+        """Nothing to release for the memory store."""
+        return
+
+
+class DiskElementStore(ElementStore):
+    """Orthogonal vectors kept in a memory-mapped file."""
+
+    def __init__(self, path, cache_size=256):
+        """Initialize an empty store writing in the file path."""
+        self._path = path
+        mode = 'r+b' if os.path.exists(path) else 'w+b'
+        # The file is not truncated, it may hold a run to restore
+        self._file = open(path, mode)
+        self._map = None
+        self._end = 0
+        # By vector: (spart, norm, p offset, p size, src offset, src size)
+        self._records = []
+        self._cache = LRUCache(cache_size)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, j):
+        return (self.spart(j), self.source(j), self.powersums(j),
+                self.norm(j))
+
+    def _write(self, obj):
+        """Write obj at the end of the records, return (offset, size)."""
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        self._file.seek(self._end)
+        self._file.write(data)
+        offset = self._end
+        self._end += len(data)
+        return offset, len(data)
+
+    def _read(self, offset, size):
+        """Read back an object written by _write."""
+        if self._map is None or offset + size > len(self._map):
+            # The map is extended to the vectors written since the last one
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        return pickle.loads(self._map[offset:offset + size])
+
+    def append(self, spart, in_src, in_p, norm):
+        """Write a new vector to the file."""
+        p_record = self._write(in_p)
+        src_record = self._write(in_src)
+        self._records.append((spart, norm) + p_record + src_record)
+        self._cache[len(self._records) - 1] = in_p
+
+    def spart(self, j):
+        return self._records[j][0]
+
+    def norm(self, j):
+        return self._records[j][1]
+
+    def powersums(self, j):
+        if j not in self._cache:
+            self._cache[j] = self._read(*self._records[j][2:4])
+        return self._cache[j]
+
+    def source(self, j):
+        return self._read(*self._records[j][4:6])
+
+    def state(self):
+        """Flush the file and return the index of the vectors."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'path': self._path, 'end': self._end,
+                'records': list(self._records)}
+
+    def restore(self, state):
+        """Use the vectors of the file indexed by state."""
+        if state['path'] != self._path:
+            raise ValueError("The state is not the one of " + self._path)
+        self._end = state['end']
+        self._records = list(state['records'])
+        self._cache.clear()
+
+    def close(self, remove=False):
+        """Close the file, and remove it if remove is True."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        if remove:
+            os.remove(self._path)
@@ -0,0 +1,127 @@
+"""Evaluation of the Jack and Macdonald superpolynomials in N variables."""
+r"""
+The evaluation of `P_\Lambda(\alpha)` at `x_1 = \dots = x_N = 1` (and the
+principal specialization of `P_\Lambda(q, t)`) is a product of a factor
+which does not depend on `N`, built from the hook lengths, and of a
+product over the cells of `\Lambda^\circledast` outside the staircase
+`\delta_{m+1}`:
+
+- `\prod_{(i, j)} (N - (i - 1) + \alpha (j - 1))` for the Jack,
+- `\prod_{(i, j)} (1 - q^{j - 1} t^{N - (i - 1)})` for the Macdonald.
+
+The first one is a polynomial in `X = N`, the second one a polynomial in
+`X = t^N`. The ``BatchEvaluator`` computes this polynomial, with the
+`N`-independent factor, once per superpartition. An element is then a
+polynomial in `X`, and the values of many elements for many `N` are the
+product of the matrix of their coefficients by the Vandermonde matrix of
+the values of `X`: one matrix product per point of the parameters.
+"""
+from sage.misc.misc_c import prod
+from sage.rings.polynomial.polynomial_ring_constructor import PolynomialRing
+from sage.matrix.constructor import Matrix
+from superpartition import _Superpartitions
+
+
+def _skew_cells(spart):
+    """Return the cells of the circle star of spart outside the staircase."""
+    ferm_deg = spart.fermionic_degree()
+    stair = _Superpartitions([[], list(range(ferm_deg, 0, -1))])
+    stair_cells = set(stair.cells())
+    circle_star = _Superpartitions([[], list(spart.circle_star())])
+    return [cell for cell in circle_star.cells() if cell not in stair_cells]
+
+
+def jack_factor(spart, X, alpha):
+    """Return the evaluation of the Jack of spart as a polynomial in N=X."""
+    hooks = prod((spart.lower_hook_length(i, j, alpha)
+                  for i, j in spart.bosonic_cells()), 1)
+    return prod((X - (i - 1) + alpha*(j - 1)
+                 for i, j in _skew_cells(spart)), X.parent().one()) / hooks
+
+
+def macdonald_factor(spart, X, q, t):
+    """Return the specialization of the Macdonald of spart in X=t^N."""
+    ferm_deg = spart.fermionic_degree()
+    stair = _Superpartitions.stair(ferm_deg - 1)
+    stairplus = _Superpartitions.stair(ferm_deg)
+    star = spart.star()
+    circle_star = spart.circle_star()
+    # The lower hook hlo_Lambda of the elements of the Macdonald basis
+    hooks = prod((1 - q**circle_star.arm_length(i, j) *
+                  t**(star.leg_length(i, j) + 1)
+                  for i, j in spart.bosonic_cells()), 1)
+    exp_denom = ((ferm_deg - 1)*(spart[0].degree() - stair.degree()) -
+                 (spart[0].b() - stair.b()))
+    constant = (t**(spart.zeta() + circle_star.b() - stairplus.b()) /
+                q**exp_denom / hooks)
+    return constant * prod((1 - q**(j - 1) * t**(1 - i) * X
+                            for i, j in _skew_cells(spart)),
+                           X.parent().one())
+
+
+class BatchEvaluator(object):
+    """Evaluations of the elements of a basis for many numbers of vars."""
+    r"""
+    ``factor(spart, X)`` returns the evaluation of the basis element of
+    ``spart`` as a polynomial in ``X`` over the base ring ``BR``, and
+    ``point(N, point)`` the value of ``X`` for ``N`` variables at a dict
+    ``point`` {parameter name: value}, possibly empty.
+    """
+
+    def __init__(self, BR, factor, point):
+        """Initialize the evaluator of a basis over BR."""
+        self._BR = BR
+        self._X = PolynomialRing(BR, 'X').gen()
+        self._factor = factor
+        self._point = point
+        self._polynomials = {}
+
+    def polynomial(self, spart):
+        """Return the polynomial in X of the basis element of spart."""
+        if spart not in self._polynomials:
+            self._polynomials[spart] = self._factor(spart, self._X)
+        return self._polynomials[spart]
+
+    def element_polynomial(self, element):
+        """Return the polynomial in X of an element of the basis."""
+        return sum((coeff * self.polynomial(spart)
+                    for spart, coeff in element.monomial_coefficients()
+                    .items()), self._X.parent().zero())
+
+    def sector_polynomials(self, sparts):
+        """Return the list of the polynomials of sparts."""
+        return [self.polynomial(spart) for spart in sparts]
+
+    def values(self, polys, Ns, points=None):
+        """Return the matrix of the values of polys for every N."""
+        r"""
+        The rows are the polynomials ``polys`` and the columns the numbers
+        of variables ``Ns``. If ``points`` is a list of dicts
+        {parameter name: value}, the coefficients are specialized at each
+        point and the columns are the pairs (point, N), point by point.
+        """
+        Ns = list(Ns)
+        degree = max([poly.degree() for poly in polys] + [0])
+        coeffs = [poly.padded_list(degree + 1) for poly in polys]
+        if points is None:
+            points = [{}]
+        blocks = []
+        for point in points:
+            if point:
+                rows = [[coeff(**point) for coeff in row] for row in coeffs]
+            else:
+                rows = coeffs
+            X_values = [self._BR(self._point(N, point)) for N in Ns]
+            vandermonde = Matrix(self._BR, degree + 1, len(Ns),
+                                 lambda k, c: X_values[c]**k)
+            blocks.append(Matrix(self._BR, len(polys), degree + 1, rows) *
+                          vandermonde)
+        out = blocks[0]
+        for block in blocks[1:]:
+            out = out.augment(block)
+        return out
+
+    def evaluate(self, element, Ns, points=None):
+        """Return the list of the values of element for every N."""
+        return self.values([self.element_polynomial(element)], Ns,
+                           points).row(0).list()
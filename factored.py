@@ -0,0 +1,233 @@
+"""Rational functions with factored denominators."""
+r"""
+The denominators of the coefficients of the Jack and Macdonald
+superpolynomials are products of a few known factors, `a + b\alpha` or
+`1 - q^a t^b` and their divisors (see ``calc_norm``, ``wqt_Lambda`` and
+``hlo_Lambda``). In the fraction field of a polynomial ring, every sum and
+product recomputes a multivariate gcd to bring the result in lowest terms.
+
+A ``FactoredFraction`` instead keeps the numerator as a polynomial and the
+denominator as a dict {irreducible factor: multiplicity}. The common
+denominator of a sum is the maximum of the multiplicities, and a product
+adds them, so that no gcd is ever computed. The numerator is only divided
+by the factors of the denominator which it may share with it: after a sum
+which enlarges the denominator, or for the cross terms of a product. New
+factors only come from divisions, whose divisors are factored once and
+for all.
+
+``FactoredFractions(K)`` is a ring-like parent for the fraction field
+``K`` of a polynomial ring over `\QQ`, which may be given to
+``SectorGramSchmidt`` as the ring of the computations.
+"""
+from sage.misc.misc_c import prod
+
+
+class FactoredFraction(object):
+    """A polynomial divided by a product of irreducible factors."""
+
+    def __init__(self, parent, numerator, factors=None):
+        """Initialize numerator / prod(f**e for f, e in factors.items())."""
+        self._parent = parent
+        self.numerator = numerator
+        if factors is None or numerator == 0:
+            factors = {}
+        self.factors = factors
+        self._inverse = None
+
+    def parent(self):
+        """Return the parent of the element."""
+        return self._parent
+
+    def __repr__(self):
+        return repr(self.value())
+
+    def value(self):
+        """Return the element in the fraction field."""
+        K = self._parent.fraction_field()
+        return K(self.numerator) / K(self.denominator())
+
+    def denominator(self):
+        """Return the expanded denominator."""
+        R = self._parent.polynomial_ring()
+        return prod((factor**exp for factor, exp in self.factors.items()),
+                    R.one())
+
+    def _coerce(self, other):
+        if isinstance(other, FactoredFraction):
+            return other
+        return self._parent(other)
+
+    def _common(self, other):
+        """Return the numerators over the common denominator, and it."""
+        common = dict(self.factors)
+        for factor, exp in other.factors.items():
+            if exp > common.get(factor, 0):
+                common[factor] = exp
+        R = self._parent.polynomial_ring()
+        num1 = self.numerator * prod(
+            (factor**(exp - self.factors.get(factor, 0))
+             for factor, exp in common.items()), R.one())
+        num2 = other.numerator * prod(
+            (factor**(exp - other.factors.get(factor, 0))
+             for factor, exp in common.items()), R.one())
+        return num1, num2, common
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        if other.numerator == 0:
+            return self
+        if self.numerator == 0:
+            return other
+        num1, num2, common = self._common(other)
+        out = FactoredFraction(self._parent, num1 + num2, common)
+        if sum(common.values()) > max(sum(self.factors.values()),
+                                      sum(other.factors.values())):
+            # The sum may share the new factors with the denominator
+            out.reduce()
+        return out
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return FactoredFraction(self._parent, -self.numerator,
+                                dict(self.factors))
+
+    def __sub__(self, other):
+        return self + (-self._coerce(other))
+
+    def __rsub__(self, other):
+        return self._coerce(other) - self
+
+    def __mul__(self, other):
+        other = self._coerce(other)
+        if self.numerator == 0 or other.numerator == 0:
+            return self._parent.zero()
+        # Only the cross terms may simplify
+        num1, factors2 = _cancel(self.numerator, other.factors)
+        num2, factors1 = _cancel(other.numerator, self.factors)
+        for factor, exp in factors2.items():
+            factors1[factor] = factors1.get(factor, 0) + exp
+        return FactoredFraction(self._parent, num1 * num2, factors1)
+
+    __rmul__ = __mul__
+
+    def inverse(self):
+        """Return the inverse, the numerator being factored once."""
+        if self.numerator == 0:
+            raise ZeroDivisionError("Division by zero.")
+        if self._inverse is None:
+            unit, factors = self._parent.factor(self.numerator)
+            self._inverse = FactoredFraction(
+                self._parent, self.denominator() / unit, dict(factors))
+        return self._inverse
+
+    def __truediv__(self, other):
+        return self * self._coerce(other).inverse()
+
+    def __rtruediv__(self, other):
+        return self._coerce(other) * self.inverse()
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, exp):
+        if exp == 0:
+            return self._parent.one()
+        if exp < 0:
+            return self.inverse()**(-exp)
+        return FactoredFraction(
+            self._parent, self.numerator**exp,
+            {factor: e * exp for factor, e in self.factors.items()})
+
+    def __eq__(self, other):
+        if not isinstance(other, FactoredFraction) and other == 0:
+            return self.numerator == 0
+        other = self._coerce(other)
+        num1, num2, common = self._common(other)
+        return num1 == num2
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def reduce(self):
+        """Divide the numerator and denominator by their common factors."""
+        self.numerator, self.factors = _cancel(self.numerator,
+                                               self.factors)
+        return self
+
+
+def _cancel(numerator, factors):
+    """Return numerator and factors divided by the factors dividing both."""
+    out = {}
+    for factor, exp in factors.items():
+        while exp > 0:
+            quo, rem = numerator.quo_rem(factor)
+            if rem != 0:
+                break
+            numerator = quo
+            exp -= 1
+        if exp > 0:
+            out[factor] = exp
+    return numerator, out
+
+
+class FactoredFractions(object):
+    """Parent of the factored fractions of a fraction field."""
+
+    def __init__(self, K):
+        """Initialize the factored fractions of the fraction field K."""
+        self._K = K
+        self._R = K.ring()
+        # The factorizations of the denominators met so far
+        self._factorizations = {}
+
+    def __repr__(self):
+        return "Factored fractions of " + repr(self._K)
+
+    def __getstate__(self):
+        # The factorizations are not sent to the worker processes
+        return {'_K': self._K, '_R': self._R}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._factorizations = {}
+
+    def fraction_field(self):
+        """Return the fraction field of the values."""
+        return self._K
+
+    def polynomial_ring(self):
+        """Return the ring of the numerators and factors."""
+        return self._R
+
+    def factor(self, poly):
+        """Return (unit, {factor: multiplicity}) of a nonzero polynomial."""
+        if poly not in self._factorizations:
+            if poly.is_constant():
+                factorization = (self._R.base_ring()(poly), {})
+            else:
+                factors = poly.factor()
+                factorization = (self._R.base_ring()(factors.unit()),
+                                 {factor: exp for factor, exp in factors})
+            self._factorizations[poly] = factorization
+        unit, factors = self._factorizations[poly]
+        return unit, dict(factors)
+
+    def __call__(self, x):
+        """Convert x, a factored fraction or an element of the field."""
+        if isinstance(x, FactoredFraction):
+            return x
+        x = self._K(x)
+        unit, factors = self.factor(x.denominator())
+        return FactoredFraction(self, self._R(x.numerator()) / unit,
+                                factors)
+
+    def zero(self):
+        """Return the zero of the ring."""
+        return FactoredFraction(self, self._R.zero())
+
+    def one(self):
+        """Return the one of the ring."""
+        return FactoredFraction(self, self._R.one())
@@ -0,0 +1,480 @@
+"""Gram-Schmidt orthogonalization of a sector in powersum coordinates."""
+r"""
+The Jack and Macdonald superpolynomials of a sector `(n, m)` are obtained
+by orthogonalizing the monomial basis, in the dominance order, for a
+scalar product which makes the powersum basis orthogonal:
+
+.. MATH::
+
+    \langle p_\Lambda, p_\Omega \rangle = \delta_{\Lambda\Omega}
+    z_\Lambda(\cdot).
+
+Every intermediate vector is kept twice, as a sparse dict
+{spart: coeff} on the source basis (the result) and on the powersum
+basis (for the scalar products). A scalar product is then a sparse dot
+product with the precomputed weights `z_\Lambda`, and the norm of each
+orthogonal vector is computed once, or given by a closed formula. All
+the arithmetic is done in the base ring of the algebra, or in a ring
+with factored denominators (see ``factored.py``).
+
+Long runs may be checkpointed: every few vectors, the orthogonal vectors
+and the list of the computed superpartitions are saved, and a new run
+with the same checkpoint starts at the first unfinished superpartition.
+The vectors may also be kept on disk instead of in memory, see
+``element_store.py``.
+"""
+import os
+import tempfile
+from multiprocessing import Pipe, Process, cpu_count
+from sage.structure.sage_object import load, save
+from superpartition import Superpartitions, _Superpartitions
+from element_store import ElementStore, DiskElementStore
+
+
+def sparse_dot(x, y, weights):
+    """Return sum_k x[k]*y[k]*weights[k] for two sparse dicts."""
+    if len(y) < len(x):
+        x, y = y, x
+    out = 0
+    for key, coeff in x.items():
+        if key in y:
+            out += coeff * y[key] * weights[key]
+    return out
+
+
+def sparse_axpy(y, a, x):
+    """Replace y by y + a*x for two sparse dicts, in place."""
+    for key, coeff in x.items():
+        value = y.get(key, 0) + a * coeff
+        if value == 0:
+            y.pop(key, None)
+        else:
+            y[key] = value
+    return y
+
+
+def _projection_worker(conn, weights):
+    """Worker: keep a shard of the orthogonal vectors and project on it."""
+    r"""
+    The messages are ``('store', j, src, p, norm)`` for a new vector of
+    the shard, ``('project', start_p, indices)`` which is answered with
+    the partial sums `\sum_j c_j v_j` on the source and powersum bases,
+    and ``('stop',)``.
+    """
+    elements = {}
+    while True:
+        message = conn.recv()
+        if message[0] == 'store':
+            elements[message[1]] = message[2:]
+        elif message[0] == 'project':
+            start_p, indices = message[1:]
+            in_src, in_p = {}, {}
+            for j in indices:
+                other_src, other_p, other_norm = elements[j]
+                proj = sparse_dot(start_p, other_p, weights)
+                if proj == 0:
+                    continue
+                coeff = -proj / other_norm
+                sparse_axpy(in_src, coeff, other_src)
+                sparse_axpy(in_p, coeff, other_p)
+            conn.send((in_src, in_p))
+        else:
+            conn.close()
+            return
+
+
+class _ProjectionWorkers(object):
+    """Processes owning blocks of the orthogonal vectors of an engine."""
+
+    def __init__(self, weights, processes, chunk_size):
+        """Start the processes, the weights are sent once."""
+        if processes is None:
+            processes = cpu_count()
+        self._chunk_size = chunk_size
+        self._conns = []
+        self._processes = []
+        for k in range(processes):
+            parent_conn, child_conn = Pipe()
+            process = Process(target=_projection_worker,
+                              args=(child_conn, weights))
+            process.daemon = True
+            process.start()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    def _owner(self, j):
+        """Return the worker of the vector of index j."""
+        return (j // self._chunk_size) % len(self._conns)
+
+    def store(self, j, in_src, in_p, norm):
+        """Send a new orthogonal vector to its worker, once."""
+        self._conns[self._owner(j)].send(('store', j, in_src, in_p, norm))
+
+    def project(self, start_p, against):
+        """Return the partial sums of the projections, one per worker."""
+        shards = {}
+        for j in against:
+            shards.setdefault(self._owner(j), []).append(j)
+        for owner, indices in shards.items():
+            self._conns[owner].send(('project', start_p, indices))
+        return [self._conns[owner].recv() for owner in shards]
+
+    def close(self):
+        """Stop the processes."""
+        for conn in self._conns:
+            conn.send(('stop',))
+        for process in self._processes:
+            process.join()
+        self._conns = []
+        self._processes = []
+
+
+class SectorGramSchmidt(object):
+    """Orthogonalization engine for one sector."""
+
+    def __init__(self, sector, to_p, weights, ring, leading_coeff=None,
+                 upper_triangular=True, norm=None, processes=1,
+                 chunk_size=16, checkpoint=None, checkpoint_every=50,
+                 out_of_core=False, norm_check_every=None):
+        r"""
+        INPUT:
+
+        - ``sector`` -- the pair `(n, m)`
+        - ``to_p`` -- the dict {(row, column): coeff} of the transition
+          matrix from the basis to orthogonalize to the powersums, the
+          superpartitions being ranked as in ``Superpartitions(n, m)``
+        - ``weights`` -- the list of the `z_\Lambda(\cdot)`, by rank
+        - ``ring`` -- the ring of the computations
+        - ``leading_coeff`` -- (default: ``None``) the leading coefficient
+          of each orthogonal vector, 1 if ``None``
+        - ``upper_triangular`` -- (default: ``True``) whether the
+          transition matrix from ``source`` is upper triangular
+        - ``norm`` -- (default: ``None``) a closed formula for the norm
+          of the orthogonal vector of a superpartition
+        - ``processes`` -- (default: 1) number of worker processes for
+          the projections in ``rows``, 1 being sequential
+        - ``chunk_size`` -- (default: 16) number of consecutive orthogonal
+          vectors held by the same worker
+        - ``checkpoint`` -- (default: ``None``) file name, without
+          extension, of the checkpoints of ``rows``
+        - ``checkpoint_every`` -- (default: 50) number of computed vectors
+          between two checkpoints
+        - ``out_of_core`` -- (default: ``False``) whether to keep the
+          orthogonal vectors in a memory-mapped file, next to the
+          checkpoint if there is one
+        - ``norm_check_every`` -- (default: ``None``) the closed formula
+          ``norm`` is checked against the computed norm every this many
+          vectors, or if ``None`` on the vectors `1, 2, 4, 8, \dots`
+          only, and trusted in between; a disagreement is recorded in
+          ``norm_mismatches`` and the formula is dropped
+        """
+        self._BR = ring
+        one = self._BR.one()
+        self.sector = tuple(sector)
+        if leading_coeff is None:
+            leading_coeff = lambda x: one
+        self._leading_coeff = leading_coeff
+        # The closed formula is for the monic vectors
+        self._norm = norm
+        self._norm_check_every = norm_check_every
+        # The (spart, formula, computed) where the formula was wrong
+        self.norm_mismatches = []
+        sparts = tuple(Superpartitions(*self.sector))
+        self._order = _Superpartitions.sort_by_dominance(list(sparts))
+        # We work as in the upper triangular case, with the smallest
+        # superpartitions first.
+        if upper_triangular:
+            self._order.reverse()
+        self._weights = {sparts[k]: self._BR(weights[k])
+                         for k in range(len(sparts))}
+        # Row k is the source element indexed by sparts[k] in powersum
+        self._to_p = [{} for spart in sparts]
+        for (row, col), coeff in to_p.items():
+            self._to_p[row][sparts[col]] = self._BR(coeff)
+        self._ranks = {sparts[k]: k for k in range(len(sparts))}
+        # Orthogonal vectors as (spart, source coords, p coords, norm)
+        if not out_of_core:
+            self._elements = ElementStore()
+        elif checkpoint is not None:
+            self._elements = DiskElementStore(checkpoint + '.elements')
+        else:
+            handle, path = tempfile.mkstemp(suffix='.elements')
+            os.close(handle)
+            self._elements = DiskElementStore(path)
+        self._index = {}
+        # The superpartitions computed, not given by known rows
+        self._computed = set()
+        self._processes = processes
+        self._chunk_size = chunk_size
+        self._workers = None
+        self._checkpoint = checkpoint
+        self._checkpoint_every = checkpoint_every
+
+    @classmethod
+    def from_algebra(cls, Sym, n, m, source, scalar, leading_coeff=None,
+                     upper_triangular=True, norm=None, ring=None,
+                     **options):
+        """Return the engine of a sector of Sym, in its base ring."""
+        r"""
+        ``source`` is a basis of ``Sym`` and ``scalar`` the function
+        `\Lambda \mapsto z_\Lambda(\cdot)`. Another ``ring`` converting
+        the elements of the base ring, such as the ``FactoredFractions``
+        of ``factored.py``, may be used for the computations. The other
+        options are those of the constructor.
+        """
+        sparts = Sym.sector_superpartitions((n, m))
+        to_p = Sym.transition_matrix(source, 'Powersum', (n, m),
+                                     output='dict')
+        if ring is None:
+            ring = Sym.base_ring()
+        return cls((n, m), to_p, [scalar(spart) for spart in sparts],
+                   ring, leading_coeff=leading_coeff,
+                   upper_triangular=upper_triangular, norm=norm, **options)
+
+    def ranks(self):
+        """Return the dict {spart: rank} of the sector."""
+        return self._ranks
+
+    def order(self):
+        """Return the superpartitions in the order of orthogonalization."""
+        return list(self._order)
+
+    def predecessors(self, spart):
+        """Return the superpartitions computed before spart and comparable."""
+        r"""
+        In the upper triangular case, these are the superpartitions
+        strictly dominated by ``spart``. Since the computing order extends
+        the dominance order, this set is closed under taking predecessors.
+        """
+        out = []
+        for other in self._order:
+            if other == spart:
+                return out
+            if other < spart or other > spart:
+                out.append(other)
+        raise ValueError(str(spart) + " is not in the sector.")
+
+    def _start(self, spart):
+        """Return the source and powersum coordinates of the start vector."""
+        coeff = self._BR(self._leading_coeff(spart))
+        in_p = {key: coeff * value
+                for key, value in self._to_p[self._ranks[spart]].items()}
+        return {spart: coeff}, in_p
+
+    def _element_norm(self, spart, in_p):
+        """Return the norm of the orthogonal vector of spart."""
+        if self._norm is None:
+            return sparse_dot(in_p, in_p, self._weights)
+        formula = self._BR(self._norm(spart)) * (
+            self._BR(self._leading_coeff(spart))**2)
+        index = len(self._elements)
+        if self._norm_check_every is None:
+            # A few vectors, the first one being a bare monomial
+            checked = index > 0 and index & (index - 1) == 0
+        else:
+            checked = index % self._norm_check_every == 0
+        if checked:
+            computed = sparse_dot(in_p, in_p, self._weights)
+            if formula != computed:
+                print("The closed formula for the norm is wrong for " +
+                      str(spart) + ", it is not used anymore.")
+                self.norm_mismatches.append((spart, formula, computed))
+                self._norm = None
+            return computed
+        return formula
+
+    def orthogonalize(self, spart, against=None):
+        """Orthogonalize spart against the stored vectors, store the result."""
+        r"""
+        ``against`` is the list of the indices of the stored vectors to
+        project on, by default all of them. Return the coordinates of the
+        orthogonal vector on the source basis.
+        """
+        start_src, start_p = self._start(spart)
+        in_src = dict(start_src)
+        in_p = dict(start_p)
+        if against is None:
+            against = range(len(self._elements))
+        if self._workers is not None:
+            # The partial sums of the workers are reduced here
+            for part_src, part_p in self._workers.project(start_p, against):
+                sparse_axpy(in_src, 1, part_src)
+                sparse_axpy(in_p, 1, part_p)
+            against = []
+        for j in against:
+            other_p = self._elements.powersums(j)
+            proj = sparse_dot(start_p, other_p, self._weights)
+            if proj == 0:
+                continue
+            coeff = -proj / self._elements.norm(j)
+            sparse_axpy(in_src, coeff, self._elements.source(j))
+            sparse_axpy(in_p, coeff, other_p)
+        self._store(spart, in_src, in_p)
+        return in_src
+
+    def _store(self, spart, in_src, in_p):
+        """Store an orthogonal vector given by its two coordinate dicts."""
+        norm = self._element_norm(spart, in_p)
+        self._index[spart] = len(self._elements)
+        if self._workers is not None:
+            self._workers.store(len(self._elements), in_src, in_p, norm)
+        self._elements.append(spart, in_src, in_p, norm)
+
+    def add_known(self, spart, row):
+        """Store the orthogonal vector of spart already known on the source."""
+        in_src = {}
+        in_p = {}
+        for key, coeff in row.items():
+            coeff = self._BR(coeff)
+            if coeff == 0:
+                continue
+            in_src[key] = coeff
+            sparse_axpy(in_p, coeff, self._to_p[self._ranks[key]])
+        self._store(spart, in_src, in_p)
+
+    def needed(self, targets=None):
+        """Return the superpartitions to compute for targets, in order."""
+        if targets is None:
+            return self.order()
+        needed = set(targets)
+        for spart in targets:
+            needed.update(self.predecessors(spart))
+        return [spart for spart in self._order if spart in needed]
+
+    def rows(self, targets=None, known=None, verbose=True):
+        """Yield the pairs (spart, {spart: coeff}) in the computing order."""
+        r"""
+        INPUT:
+
+        - ``targets`` -- (default: ``None``) a list of superpartitions of
+          the sector; only they and the superpartitions they dominate are
+          computed, each one being orthogonalized against the comparable
+          predecessors only. ``None`` means the whole sector.
+        - ``known`` -- (default: ``None``) a dict {spart: row} of rows
+          already computed, for instance a partial cache. They are used
+          as they are and not yielded again.
+
+        In the whole sector mode, the dict of a superpartition contains
+        all the superpartitions computed before it, with a zero
+        coefficient if needed. Otherwise it contains its predecessors.
+
+        With ``processes > 1``, the projections on the stored vectors are
+        split between worker processes, each one receiving the vectors
+        of its blocks of ``chunk_size`` once, and the partial sums are
+        added here. The arithmetic being exact, the rows are the same.
+
+        With a ``checkpoint``, the state is saved every
+        ``checkpoint_every`` computed vectors and when the run is
+        interrupted. If a checkpoint of the same computation exists, the
+        rows it holds are yielded again without being recomputed and the
+        run goes on from the first unfinished superpartition. The
+        checkpoint is removed once all the rows are yielded. The file of
+        an ``out_of_core`` run is closed at the end of the rows.
+        """
+        if known is None:
+            known = {}
+        needed = self.needed(targets)
+        total_loops = len(needed)
+        zero = self._BR.zero()
+        self._resume(targets)
+        if self._processes != 1 and self._workers is None:
+            self._workers = _ProjectionWorkers(
+                self._weights, self._processes, self._chunk_size)
+            for j in range(len(self._elements)):
+                self._workers.store(j, *self._elements[j][1:])
+        if verbose:
+            print("Computing...")
+        new_vectors = 0
+        finished = False
+        try:
+            for i, spart in enumerate(needed):
+                if verbose and i > 0:
+                    print(str(i)+" superpartitions computed out of " +
+                          str(total_loops))
+                if spart in known and spart not in self._index:
+                    self.add_known(spart, known[spart])
+                    continue
+                if spart in self._index and spart not in self._computed:
+                    continue
+                if targets is None:
+                    against = list(range(self._index.get(
+                        spart, len(self._elements))))
+                else:
+                    against = [self._index[other]
+                               for other in self.predecessors(spart)]
+                if spart in self._index:
+                    # Restored from the checkpoint
+                    in_src = self._elements.source(self._index[spart])
+                else:
+                    in_src = self.orthogonalize(spart, against)
+                    self._computed.add(spart)
+                    new_vectors += 1
+                    if (self._checkpoint is not None and
+                            new_vectors % self._checkpoint_every == 0):
+                        self.save_checkpoint(targets)
+                keys = [self._elements.spart(j) for j in against] + [spart]
+                yield spart, {key: in_src.get(key, zero) for key in keys}
+            finished = True
+        finally:
+            self.close()
+            if self._checkpoint is not None:
+                if finished:
+                    self._remove_checkpoint()
+                elif new_vectors > 0:
+                    self.save_checkpoint(targets)
+            # A file of vectors is only kept for a checkpoint to resume
+            self._elements.close(remove=finished or self._checkpoint is None)
+
+    def _checkpoint_state(self, targets):
+        """Return the description of the computation of a checkpoint."""
+        if targets is not None:
+            targets = sorted(self._ranks[spart] for spart in targets)
+        return {'sector': self.sector, 'targets': targets}
+
+    def save_checkpoint(self, targets=None):
+        """Save the orthogonal vectors computed so far, atomically."""
+        state = self._checkpoint_state(targets)
+        state['elements'] = self._elements.state()
+        state['computed'] = list(self._computed)
+        state['formula'] = self._norm is not None
+        # The previous checkpoint is replaced only once the new one is
+        # completely written
+        save(state, self._checkpoint + '.tmp.sobj')
+        os.rename(self._checkpoint + '.tmp.sobj',
+                  self._checkpoint + '.sobj')
+
+    def _resume(self, targets):
+        """Restore the vectors of the checkpoint, if it matches targets."""
+        if (self._checkpoint is None or len(self._elements) > 0 or
+                not os.path.exists(self._checkpoint + '.sobj')):
+            return
+        state = load(self._checkpoint + '.sobj')
+        description = self._checkpoint_state(targets)
+        if any(state[key] != value for key, value in description.items()):
+            print("The checkpoint " + self._checkpoint + " is for another "
+                  "computation, starting over.")
+            return
+        self._elements.restore(state['elements'])
+        self._index = {self._elements.spart(j): j
+                       for j in range(len(self._elements))}
+        self._computed = set(state['computed'])
+        if not state['formula']:
+            self._norm = None
+        print("Resuming from " + str(len(self._computed)) +
+              " computed superpartitions.")
+
+    def _remove_checkpoint(self):
+        """Remove the checkpoint of a finished run."""
+        if os.path.exists(self._checkpoint + '.sobj'):
+            os.remove(self._checkpoint + '.sobj')
+
+    def close(self):
+        """Stop the worker processes, if any."""
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
+
+    def run(self, targets=None, known=None, verbose=True):
+        """Return the dict {spart: {spart: coeff}} of the computed rows."""
+        return dict(self.rows(targets=targets, known=known,
+                              verbose=verbose))
@@ -0,0 +1,234 @@
+"""Jack superpolynomials by evaluation and rational interpolation."""
+r"""
+Instead of running Gram-Schmidt with coefficients in `\QQ(\alpha)`, the
+sector is orthogonalized for many specializations `\alpha = a` of the
+parameter, exactly over `\QQ`, or over `\GF(p)` for several word-size
+primes whose results are lifted to `\QQ` by the Chinese remainder theorem
+and rational reconstruction. Every coefficient is then recovered as a
+rational function of `\alpha` by rational interpolation (Cauchy
+interpolation with the extended Euclidean algorithm).
+
+The points `a = 1, 2, 3, \dots` are taken in batches, one process per
+point. Since the scalar product is positive definite for `\alpha > 0`,
+neither the norms nor the denominators of the coefficients vanish at
+these points. The interpolation stops once two successive batches give
+the same rational functions.
+"""
+import itertools
+from multiprocessing import Pool, cpu_count
+from sage.rings.rational_field import QQ
+from sage.rings.finite_rings.finite_field_constructor import GF
+from sage.misc.misc_c import prod
+from gram_schmidt import SectorGramSchmidt
+from multimodular import word_primes, crt_update, rational_reconstruction
+
+# Number of primes for which a point may be degenerate before we drop it
+_MAX_FAILURES = 3
+
+
+def _gram_at_point(task):
+    """Worker: orthogonalize a sector with the parameters specialized."""
+    r"""
+    Return ``(point, prime, values)`` where ``values`` is the dict
+    {(row rank, column rank): coeff}, or ``None`` if the specialization
+    is degenerate.
+    """
+    sector, to_p, weights, upper_triangular, point, prime = task
+    ring = QQ if prime is None else GF(prime)
+    args = point if isinstance(point, tuple) else (point,)
+    try:
+        point_weights = [ring(weight(*args)) for weight in weights]
+        engine = SectorGramSchmidt(sector, to_p, point_weights, ring,
+                                   upper_triangular=upper_triangular)
+        rows = engine.run(verbose=False)
+    except ZeroDivisionError:
+        return point, prime, None
+    ranks = engine.ranks()
+    values = {}
+    for spart, row in rows.items():
+        for key, coeff in row.items():
+            values[(ranks[spart], ranks[key])] = coeff
+    return point, prime, values
+
+
+def rational_constants(entries):
+    """Convert the constant values of a dict of parameter ring elements."""
+    out = {}
+    for key, coeff in entries.items():
+        num = coeff.numerator().constant_coefficient()
+        den = coeff.denominator().constant_coefficient()
+        out[key] = QQ(num) / QQ(den)
+    return out
+
+
+def map_tasks(function, tasks, pool=None):
+    """Map function on the tasks, with the process pool if there is one."""
+    if pool is None:
+        return [function(task) for task in tasks]
+    return pool.map(function, tasks)
+
+
+def rational_interpolation(points, values, R):
+    """Return (num, den) in R interpolating the values, None if it fails."""
+    r"""
+    ``R`` is a univariate polynomial ring over a field. The degrees of
+    the numerator and denominator are balanced, which requires their
+    sum to be smaller than the number of points.
+    """
+    K = R.base_ring()
+    points = [K(a) for a in points]
+    values = [K(v) for v in values]
+    x = R.gen()
+    f = R.lagrange_polynomial(list(zip(points, values)))
+    if f == 0:
+        return R.zero(), R.one()
+    modulus = prod(x - a for a in points)
+    bound = (len(points) - 1) // 2
+    r0, r1 = modulus, f
+    t0, t1 = R.zero(), R.one()
+    while r1 != 0 and r1.degree() > bound:
+        quo, rem = r0.quo_rem(r1)
+        r0, r1 = r1, rem
+        t0, t1 = t1, t0 - quo * t1
+    if r1 == 0 or t1.degree() >= len(points) - bound:
+        return None
+    if r1.gcd(t1) != 1 or any(t1(a) == 0 for a in points):
+        return None
+    lc = t1.leading_coefficient()
+    return r1 / lc, t1 / lc
+
+
+def _lift_values(residues, moduli):
+    """Lift the dicts of residues of one point, None if not yet possible."""
+    keys = sorted(residues[0].keys())
+    lifted, modulus = None, 1
+    for values, p in zip(residues, moduli):
+        lifted, modulus = crt_update(lifted, modulus,
+                                     [int(values[key]) for key in keys], p)
+    out = {}
+    for key, value in zip(keys, lifted):
+        frac = rational_reconstruction(int(value), modulus)
+        if frac is None:
+            return None
+        out[key] = QQ(frac[0]) / frac[1]
+    return out
+
+
+class _PointSolver(object):
+    """Exact values of a sector at points, over QQ or by several primes."""
+
+    def __init__(self, sector, to_p, weights, upper_triangular, modular,
+                 pool):
+        self._task = (sector, to_p, weights, upper_triangular)
+        self._modular = modular
+        self._pool = pool
+        self._primes = word_primes()
+        self._residues = {}
+        self._failures = {}
+
+    def solve(self, points):
+        """Return {point: values} for the points which are not degenerate."""
+        if not self._modular:
+            tasks = [self._task + (point, None) for point in points]
+            return {point: values for point, prime, values in
+                    map_tasks(_gram_at_point, tasks, self._pool)
+                    if values is not None}
+        solved = {}
+        previous = {}
+        pending = list(points)
+        while pending:
+            # One new prime per pending point at each round
+            tasks = [self._task + (point, next(self._primes))
+                     for point in pending]
+            results = map_tasks(_gram_at_point, tasks, self._pool)
+            still_pending = []
+            for point, prime, values in results:
+                if values is None:
+                    # We give up the points degenerate for several primes
+                    failures = self._failures.get(point, 0) + 1
+                    self._failures[point] = failures
+                    if failures < _MAX_FAILURES:
+                        still_pending.append(point)
+                    continue
+                residues = self._residues.setdefault(point, [])
+                residues.append((values, prime))
+                candidate = _lift_values([r[0] for r in residues],
+                                         [r[1] for r in residues])
+                # The lifting stops once two successive ones agree
+                if candidate is not None and candidate == previous.get(
+                        point):
+                    solved[point] = candidate
+                else:
+                    previous[point] = candidate
+                    still_pending.append(point)
+            pending = still_pending
+        return solved
+
+
+def interpolate_sector(sector, to_p, weights, R, upper_triangular=True,
+                       processes=None, batch=None, max_points=200,
+                       modular=False):
+    """Return {(row rank, col rank): (num, den)} of a sector, or None."""
+    r"""
+    INPUT:
+
+    - ``sector``, ``to_p``, ``upper_triangular`` -- as for
+      ``SectorGramSchmidt``
+    - ``weights`` -- the list of the weights `z_\Lambda(\alpha)` by rank,
+      as elements of ``R`` or of its fraction field
+    - ``R`` -- the univariate polynomial ring over `\QQ` of the parameter
+    - ``processes`` -- (default: ``None``) number of worker processes,
+      ``None`` lets ``multiprocessing`` decide and ``1`` disables the pool
+    - ``batch`` -- (default: number of processes) number of new points
+      between two interpolation attempts
+    - ``max_points`` -- (default: 200) number of points tried, degenerate
+      ones included, after which we give up and return ``None``
+    - ``modular`` -- (default: ``False``) solve at each point modulo
+      word-size primes instead of over `\QQ`
+    """
+    pool = None
+    if processes != 1:
+        pool = Pool(processes)
+        if batch is None:
+            batch = processes or cpu_count()
+    if batch is None:
+        batch = 1
+    # At least three points before the first attempt
+    batch = max(batch, 3)
+    solver = _PointSolver(sector, to_p, weights, upper_triangular, modular,
+                          pool)
+    points = itertools.count(1)
+    samples = {}
+    previous = None
+    tried = 0
+    try:
+        while tried < max_points:
+            samples.update(solver.solve([next(points)
+                                         for k in range(batch)]))
+            tried += batch
+            candidate = _interpolate_samples(samples, R)
+            if candidate is not None and candidate == previous:
+                return candidate
+            previous = candidate
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return None
+
+
+def _interpolate_samples(samples, R):
+    """Interpolate every coefficient of the samples, None if one fails."""
+    if not samples:
+        # Every point was degenerate
+        return None
+    points = sorted(samples.keys())
+    keys = samples[points[0]].keys()
+    out = {}
+    for key in keys:
+        frac = rational_interpolation(
+            points, [samples[point][key] for point in points], R)
+        if frac is None:
+            return None
+        out[key] = frac
+    return out
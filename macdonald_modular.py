@@ -0,0 +1,307 @@
+"""Macdonald superpolynomials by modular evaluation and interpolation."""
+r"""
+The Gram-Schmidt procedure for the Macdonald superpolynomials works with
+rational functions of `q` and `t`. Here the sector is instead computed at
+many points `(q, t)` modulo word-size primes: the Gram matrix of the
+monomials is built with NumPy and orthogonalized by an `LDL^T` elimination
+modulo `p`, one vectorized row operation per pivot.
+
+The denominators of the coefficients of `P_\Lambda` divide the lower hook
+product
+
+.. MATH::
+
+    h_\Lambda(q, t) = \prod_{s \in B\Lambda}
+    (1 - q^{a_{\Lambda^\circledast}(s)} t^{l_{\Lambda^*}(s) + 1}),
+
+(``Macdonald.Element.hlo_Lambda``), so that `h_\Lambda P_\Lambda` has
+polynomial coefficients. These are interpolated on a grid of points whose
+size is given by the degrees of `h_\Lambda`, lifted with the Chinese
+remainder theorem until two successive primes agree, and checked at extra
+random points modulo a fresh prime. If the check fails, the degree bounds
+are doubled; after a few failures we give up.
+"""
+import random
+import numpy
+from multiprocessing import Pool
+from sage.rings.rational_field import QQ
+from multimodular import (word_primes, inverse_mod_p, crt_update,
+                          rational_reconstruction)
+from interpolation import map_tasks
+
+# The primes are below 2^23 so that the sums of products of residues of
+# the Gram matrices fit in a signed 64 bits integer for sectors of size up
+# to 2^17.
+_KERNEL_PRIME_BOUND = 2**23
+
+
+def rational_mod(x, p):
+    """Reduce a rational number modulo p."""
+    den = int(QQ(x).denominator()) % p
+    if den == 0:
+        raise ZeroDivisionError("The denominator vanishes modulo p.")
+    return int(QQ(x).numerator()) * pow(den, p - 2, p) % p
+
+
+def poly_mod(poly_dict, q, t, p):
+    """Evaluate {(i, j): coeff} at (q, t) modulo p."""
+    out = 0
+    for (i, j), coeff in poly_dict.items():
+        out += rational_mod(coeff, p) * pow(q, i, p) * pow(t, j, p)
+    return out % p
+
+
+def weight_mod(data, q, t, p):
+    """Return z_Lambda(q, t) modulo p from (fermionic degree, parts, z)."""
+    q_exp, parts, z = data
+    out = pow(q, q_exp, p) * rational_mod(z, p)
+    for part in parts:
+        den = (1 - pow(t, part, p)) % p
+        if den == 0:
+            raise ZeroDivisionError("The weight has a pole at this point.")
+        out = out * (1 - pow(q, part, p)) * pow(den, p - 2, p) % p
+    return out % p
+
+
+def orthogonalize_mod_p(A, w, p):
+    """Return the unit lower triangular C with C A diag(w) A^T C^T diagonal."""
+    r"""
+    Row `i` of ``C`` gives the coefficients of the `i`-th orthogonal
+    vector on the rows of ``A``, which is the Gram-Schmidt procedure in
+    the order of the rows. Return ``None`` if a pivot vanishes.
+    """
+    G = ((A * w) % p).dot(A.T) % p
+    size = G.shape[0]
+    C = numpy.identity(size, dtype=numpy.int64)
+    for i in range(size):
+        pivot = int(G[i, i])
+        if pivot == 0:
+            return None
+        inv = pow(pivot, p - 2, p)
+        factors = (G[i+1:, i] * inv) % p
+        G[i+1:] = (G[i+1:] - numpy.outer(factors, G[i]) % p) % p
+        C[i+1:] = (C[i+1:] - numpy.outer(factors, C[i]) % p) % p
+    return C
+
+
+def _macdonald_at_point(task):
+    """Worker: return (point, p, h_Lambda times the coefficients mod p)."""
+    r"""
+    The values are the lower triangular entries of the transition matrix,
+    row by row in the order of the orthogonalization, or ``None`` if the
+    point is degenerate.
+    """
+    order, to_p, weight_data, hooks, point, p = task
+    q, t = point
+    size = len(order)
+    try:
+        w = numpy.array([weight_mod(data, q, t, p) for data in weight_data],
+                        dtype=numpy.int64)
+        position = {rank: k for k, rank in enumerate(order)}
+        A = numpy.zeros((size, size), dtype=numpy.int64)
+        for (row, col), coeff in to_p.items():
+            A[position[row], col] = rational_mod(coeff, p)
+        hook_values = numpy.array([poly_mod(hooks[rank], q, t, p)
+                                   for rank in order], dtype=numpy.int64)
+    except ZeroDivisionError:
+        return point, p, None
+    C = orthogonalize_mod_p(A, w, p)
+    if C is None:
+        return point, p, None
+    values = (C * hook_values[:, None]) % p
+    return point, p, values[numpy.tril_indices(size)]
+
+
+def _distinct(rng, low, high, count):
+    """Return count distinct random integers of [low, high)."""
+    # Without building the list of the candidates, p is large
+    drawn = set()
+    out = []
+    while len(out) < count:
+        x = rng.randrange(low, high)
+        if x not in drawn:
+            drawn.add(x)
+            out.append(x)
+    return out
+
+
+def _grid(degrees, p, rng):
+    """Return distinct nonzero abscissas for q and t modulo p."""
+    deg_q, deg_t = degrees
+    qs = _distinct(rng, 2, p, deg_q + 1)
+    ts = _distinct(rng, 2, p, deg_t + 1)
+    return qs, ts
+
+
+def _vandermonde_inverse(points, p):
+    """Return the inverse of the Vandermonde matrix of points modulo p."""
+    rows = [[pow(x, i, p) for i in range(len(points))] for x in points]
+    return inverse_mod_p(rows, p)
+
+
+def _coefficients_mod_p(values, qs, ts, p):
+    """Interpolate the grid values, return the array [deg_t, deg_q, entry]."""
+    Vq = _vandermonde_inverse(qs, p)
+    Vt = _vandermonde_inverse(ts, p)
+    by_q = numpy.tensordot(Vq, values, axes=(1, 0)) % p
+    return numpy.tensordot(Vt, by_q, axes=(1, 1)) % p
+
+
+class ModularMacdonald(object):
+    """Modular interpolation engine for one Macdonald sector."""
+
+    def __init__(self, order, to_p, weight_data, hooks, degrees,
+                 pool=None, batch=1, seed=0):
+        r"""
+        INPUT:
+
+        - ``order`` -- the ranks of the superpartitions in the order of
+          the orthogonalization
+        - ``to_p`` -- the dict {(row rank, col rank): rational} of the
+          transition matrix from the monomials to the powersums
+        - ``weight_data`` -- by rank, the triple (fermionic degree,
+          bosonic parts, signed `z_\Lambda`) defining `z_\Lambda(q, t)`
+        - ``hooks`` -- by rank, the dict {(i, j): coeff} of `h_\Lambda`
+        - ``degrees`` -- the pair of degree bounds in `q` and `t`
+        """
+        self._data = (order, to_p, weight_data, hooks)
+        self._size = len(order)
+        self.degrees = tuple(degrees)
+        self._pool = pool
+        self._batch = batch
+        self._rng = random.Random(seed)
+        self._primes = word_primes(_KERNEL_PRIME_BOUND)
+
+    def _values_for_primes(self, primes):
+        """Return {p: (qs, ts, coefficient array)} for the usable primes."""
+        grids = {p: _grid(self.degrees, p, self._rng) for p in primes}
+        tasks = [self._data + ((q, t), p)
+                 for p in primes for q in grids[p][0] for t in grids[p][1]]
+        results = map_tasks(_macdonald_at_point, tasks, self._pool)
+        values = {}
+        for point, p, entries in results:
+            if entries is None:
+                # An unlucky point, we drop the prime
+                values[p] = None
+            elif values.get(p, 0) is not None:
+                values.setdefault(p, {})[point] = entries
+        out = {}
+        for p, by_point in values.items():
+            if by_point is None:
+                continue
+            qs, ts = grids[p]
+            grid = numpy.array([[by_point[(q, t)] for t in ts] for q in qs],
+                               dtype=numpy.int64)
+            out[p] = _coefficients_mod_p(grid, qs, ts, p)
+        return out
+
+    def lift(self, max_primes=40):
+        """Return the rational coefficient array, None if no convergence."""
+        lifted, modulus = None, 1
+        previous = None
+        used_primes = 0
+        while used_primes < max_primes:
+            primes = [next(self._primes) for k in range(self._batch)]
+            used_primes += self._batch
+            for p, coeffs in self._values_for_primes(primes).items():
+                lifted, modulus = crt_update(lifted, modulus,
+                                             coeffs.flatten(), p)
+            if lifted is None:
+                continue
+            candidate = []
+            for value in lifted:
+                frac = rational_reconstruction(int(value), modulus)
+                if frac is None:
+                    candidate = None
+                    break
+                candidate.append(QQ(frac[0]) / frac[1])
+            # We stop once the reconstruction is stable
+            if candidate is not None and candidate == previous:
+                shape = (self.degrees[1] + 1, self.degrees[0] + 1,
+                         self._size * (self._size + 1) // 2)
+                return numpy.array(candidate, dtype=object).reshape(shape)
+            previous = candidate
+        return None
+
+    def verify(self, coeffs, points=2, max_tries=20):
+        """Check the coefficients at random points modulo a fresh prime."""
+        r"""
+        The degenerate points are replaced by fresh ones. The check fails
+        if fewer than ``points`` points could be checked out of
+        ``max_tries``.
+        """
+        p = next(self._primes)
+        checked, tried = 0, 0
+        while checked < points and tried < max_tries:
+            tasks = [self._data + ((self._rng.randrange(2, p),
+                                    self._rng.randrange(2, p)), p)
+                     for k in range(points - checked)]
+            tried += len(tasks)
+            for (q, t), p, entries in map_tasks(_macdonald_at_point, tasks,
+                                                self._pool):
+                if entries is None:
+                    continue
+                powers_q = [pow(q, i, p) for i in range(coeffs.shape[1])]
+                powers_t = [pow(t, j, p) for j in range(coeffs.shape[0])]
+                for entry in range(coeffs.shape[2]):
+                    value = 0
+                    for j in range(coeffs.shape[0]):
+                        for i in range(coeffs.shape[1]):
+                            coeff = coeffs[j, i, entry]
+                            if coeff != 0:
+                                value += (rational_mod(coeff, p) *
+                                          powers_q[i] * powers_t[j])
+                    if value % p != entries[entry]:
+                        return False
+                checked += 1
+        return checked >= points
+
+
+def modular_macdonald_sector(order, to_p, weight_data, hooks, degrees,
+                             processes=None, batch=None, max_primes=40,
+                             retries=2, seed=0):
+    """Return {(row position, col position): {(i, j): coeff}} or None."""
+    r"""
+    The keys are positions in ``order`` and the values the coefficients
+    of `h_\Lambda` times the Macdonald coefficients, as dicts of
+    exponents of `(q, t)`. See ``ModularMacdonald`` for the data.
+
+    - ``processes`` -- (default: ``None``) number of worker processes,
+      ``None`` lets ``multiprocessing`` decide and ``1`` disables the pool
+    - ``batch`` -- (default: 1) number of primes handled at once
+    - ``max_primes`` -- (default: 40) number of primes for each degree
+      bound after which we give up
+    - ``retries`` -- (default: 2) number of times the degree bounds are
+      doubled when the check at random points fails
+    """
+    pool = None
+    if processes != 1:
+        pool = Pool(processes)
+    if batch is None:
+        batch = 1
+    try:
+        for attempt in range(retries + 1):
+            engine = ModularMacdonald(order, to_p, weight_data, hooks,
+                                      degrees, pool=pool, batch=batch,
+                                      seed=seed + attempt)
+            coeffs = engine.lift(max_primes=max_primes)
+            if coeffs is not None and engine.verify(coeffs):
+                break
+            degrees = (2 * degrees[0] + 1, 2 * degrees[1] + 1)
+        else:
+            return None
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    size = len(order)
+    rows, cols = numpy.tril_indices(size)
+    out = {}
+    for entry in range(len(rows)):
+        poly = {}
+        for j in range(coeffs.shape[0]):
+            for i in range(coeffs.shape[1]):
+                if coeffs[j, i, entry] != 0:
+                    poly[(i, j)] = coeffs[j, i, entry]
+        out[(int(rows[entry]), int(cols[entry]))] = poly
+    return out
@@ -0,0 +1,181 @@
+"""Multi-modular computation of exact rational transition matrices."""
+r"""
+The transition matrices between the Schur-type bases are computed over
+`\QQ` and then inverted. In large sectors the dense rational inverse
+suffers from coefficient blow-up. The functions of this module compute
+the inverse modulo several word-size primes with NumPy integer arrays,
+lift the residues with the Chinese remainder theorem and recover the
+rational entries by rational reconstruction. The lifting stops as soon
+as two successive reconstructions agree, and the result is then checked
+exactly.
+"""
+import numpy
+from multiprocessing import Pool, cpu_count
+from sage.rings.rational_field import QQ
+from sage.rings.all import Integer
+from sage.arith.all import lcm, gcd, previous_prime
+from sage.matrix.constructor import Matrix
+
+# Primes are taken below 2^31 so that the product of two residues
+# always fits in a signed 64 bits integer.
+_WORD_PRIME_BOUND = 2**31
+
+
+def word_primes(start=_WORD_PRIME_BOUND):
+    """Yield the primes below start in decreasing order."""
+    p = start
+    while p > 2**20:
+        p = previous_prime(p)
+        yield int(p)
+
+
+def inverse_mod_p(rows, p):
+    """Return the inverse of an integer matrix modulo p, None if singular."""
+    r"""
+    The matrix is given as a list of rows of integers already reduced
+    modulo ``p``. The inverse is computed by Gauss-Jordan elimination
+    on the augmented matrix, one vectorized row operation per pivot.
+    """
+    A = numpy.array(rows, dtype=numpy.int64) % p
+    size = A.shape[0]
+    aug = numpy.concatenate(
+        [A, numpy.identity(size, dtype=numpy.int64)], axis=1)
+    for col in range(size):
+        non_zero = numpy.nonzero(aug[col:, col])[0]
+        if len(non_zero) == 0:
+            # The matrix is singular modulo p (unlucky prime)
+            return None
+        pivot = col + non_zero[0]
+        if pivot != col:
+            aug[[col, pivot]] = aug[[pivot, col]]
+        inv = pow(int(aug[col, col]), p - 2, p)
+        aug[col] = (aug[col] * inv) % p
+        factors = aug[:, col].copy()
+        factors[col] = 0
+        aug = (aug - numpy.outer(factors, aug[col]) % p) % p
+    return aug[:, size:]
+
+
+def _inverse_mod_prime(args):
+    """Worker for the process pool."""
+    rows, p = args
+    return p, inverse_mod_p(rows, p)
+
+
+def crt_update(lifted, modulus, residues, p):
+    """Combine lifted values modulo modulus with residues modulo p."""
+    residues = numpy.array(residues, dtype=object)
+    if lifted is None:
+        return residues, p
+    inv = pow(modulus % p, p - 2, p)
+    correction = ((residues - lifted % p) * inv) % p
+    return lifted + modulus * correction, modulus * p
+
+
+def rational_reconstruction(a, m):
+    """Return (n, d) with n/d = a mod m and |n|, d <= sqrt(m/2)."""
+    r"""
+    Return ``None`` if no such fraction exists. This is the classical
+    half extended Euclidean algorithm.
+    """
+    a = a % m
+    if a == 0:
+        return (0, 1)
+    bound = Integer(m // 2).isqrt()
+    r0, r1 = m, a
+    s0, s1 = 0, 1
+    while r1 > bound:
+        quo = r0 // r1
+        r0, r1 = r1, r0 - quo * r1
+        s0, s1 = s1, s0 - quo * s1
+    if s1 == 0 or abs(s1) > bound:
+        return None
+    if s1 < 0:
+        r1, s1 = -r1, -s1
+    if gcd(r1, s1) != 1:
+        return None
+    return (r1, s1)
+
+
+def reconstruct_matrix(lifted, modulus):
+    """Return the list of rational rows, or None if reconstruction fails."""
+    rows = []
+    for lifted_row in lifted:
+        row = []
+        for value in lifted_row:
+            frac = rational_reconstruction(int(value), modulus)
+            if frac is None:
+                return None
+            row.append(QQ(frac[0]) / frac[1])
+        rows.append(row)
+    return rows
+
+
+def multimodular_inverse(TM, processes=None, batch=None, max_primes=400,
+                         min_size=16, verify=True):
+    """Return the inverse of a rational matrix by multi-modular lifting."""
+    r"""
+    INPUT:
+
+    - ``TM`` -- a square matrix over `\QQ`
+    - ``processes`` -- (default: ``None``) number of worker processes,
+      ``None`` lets ``multiprocessing`` decide and ``1`` disables the pool
+    - ``batch`` -- (default: number of processes) number of primes
+      handled between two reconstruction attempts
+    - ``max_primes`` -- (default: 400) number of primes after which we
+      give up and fall back to the dense inverse
+    - ``min_size`` -- (default: 16) matrices smaller than this are
+      inverted with the dense algorithm, the pool is not worth it
+    - ``verify`` -- (default: ``True``) check that the product of the
+      matrix with the reconstructed inverse is the identity
+    """
+    size = TM.nrows()
+    if size < min_size:
+        return TM.inverse()
+    # TM = B/d with B integral, so that TM^(-1) = d*B^(-1)
+    denom = lcm([x.denominator() for x in TM.list()])
+    B = [[int(x * denom) for x in row] for row in TM.rows()]
+    pool = None
+    if processes != 1:
+        pool = Pool(processes)
+        if batch is None:
+            batch = processes or cpu_count()
+    if batch is None:
+        batch = 1
+    primes = word_primes()
+    lifted = None
+    modulus = 1
+    previous = None
+    used_primes = 0
+    try:
+        while used_primes < max_primes:
+            batch_primes = [next(primes) for k in range(batch)]
+            used_primes += batch
+            tasks = [([[x % p for x in row] for row in B], p)
+                     for p in batch_primes]
+            if pool is None:
+                results = [_inverse_mod_prime(task) for task in tasks]
+            else:
+                results = pool.map(_inverse_mod_prime, tasks)
+            for p, inv in results:
+                if inv is None:
+                    continue
+                lifted, modulus = crt_update(lifted, modulus, inv, p)
+            if lifted is None:
+                continue
+            candidate = reconstruct_matrix(lifted, modulus)
+            # We stop once the reconstruction is stable
+            if candidate is not None and candidate == previous:
+                inverse = denom * Matrix(QQ, candidate)
+                if not verify or TM * inverse == 1:
+                    return inverse
+            previous = candidate
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if lifted is None:
+        raise ZeroDivisionError("The matrix must be nonsingular.")
+    print("The multi-modular inverse did not stabilize, "
+          "using the dense inverse.")
+    return TM.inverse()
@@ -0,0 +1,221 @@
+"""Macdonald superpolynomials from the non-symmetric Macdonald polynomials."""
+r"""
+A Macdonald superpolynomial is obtained from a single non-symmetric
+Macdonald polynomial `E_\eta` in `N` variables:
+
+.. MATH::
+
+    P_\Lambda \propto \sum_{\sigma \in S_N} \sigma \big(
+    \theta_1 \cdots \theta_m U^+_{m+1, \dots, N} E_\eta \big),
+
+where `\eta = (\Lambda^a_m, \dots, \Lambda^a_1, \Lambda^s_{N-m}, \dots,
+\Lambda^s_1)` (the bosonic parts padded with zeros) and `U^+` is the sum of
+the Hecke operators `T_w` of the permutations of the variables
+`x_{m+1}, \dots, x_N`.
+
+Everything is done on dicts {exponent tuple: coeff} with coefficients in
+any field containing `q` and `t`, without Singular:
+
+- `E_\eta` is built by the Knop-Sahi recursion, with the raising operator
+  `\Phi f = x_N f(q x_N, x_1, \dots, x_{N-1})`, which sends `E_\zeta` to
+  `E_{(\zeta_2, \dots, \zeta_N, \zeta_1 + 1)}`, and the intertwiners
+  `E_{s_i \zeta} \propto (T_i + (1-t)/(1 - \bar\zeta_{i+1} /
+  \bar\zeta_i)) E_\zeta` for `\zeta_i < \zeta_{i+1}`, where
+  `\bar\zeta` is the spectral vector. The polynomials of the
+  recursion are cached.
+- `T_i = t + (t x_i - x_{i+1}) (x_i - x_{i+1})^{-1} (s_i - 1)` is applied
+  monomial by monomial, the images of the monomials being cached, and
+  `U^+` is factored over the cosets of `S_{k-1}` in `S_k`, which needs
+  `O(N^2)` applications of the `T_i` instead of one per permutation.
+- The coefficient of `m_\Omega` is read on the monomials
+  `\theta_1 \cdots \theta_m x^{(\tau\Omega^a, \Omega^s)}`, `\tau \in
+  S_m`, of the antisymmetrization, so that the symmetrization over `S_N`
+  is never computed.
+"""
+import itertools
+from multiprocessing import Pool
+from interpolation import map_tasks
+
+
+def _add(poly, key, coeff):
+    """Add coeff to poly[key], in place, dropping the zeros."""
+    value = poly.get(key, 0) + coeff
+    if value == 0:
+        poly.pop(key, None)
+    else:
+        poly[key] = value
+
+
+def spectral_vector(eta, q, t):
+    """Return the eigenvalues of the Cherednik operators on E_eta."""
+    out = []
+    for i, part in enumerate(eta):
+        k = (sum(1 for j in range(i) if eta[j] >= part) +
+             sum(1 for j in range(i + 1, len(eta)) if eta[j] > part))
+        out.append(q**part * t**(-k))
+    return out
+
+
+def phi(poly, q):
+    """Return x_N f(q x_N, x_1, ..., x_(N-1)) for the dict f of poly."""
+    return {exps[1:] + (exps[0] + 1,): coeff * q**exps[0]
+            for exps, coeff in poly.items()}
+
+
+class NonSymmetricMacdonald(object):
+    """Non-symmetric Macdonald polynomials in N variables."""
+
+    def __init__(self, N, q, t):
+        """Initialize the caches for N variables and the parameters q, t."""
+        self.N = N
+        self._q = q
+        self._t = t
+        self._E = {(0,) * N: {(0,) * N: t**0}}
+        self._T = {}
+
+    def _T_on_monomial(self, exps, i):
+        """Return T_i x^exps as a dict."""
+        key = (exps, i)
+        if key in self._T:
+            return self._T[key]
+        t = self._t
+        out = {exps: t}
+        a, b = exps[i], exps[i+1]
+        if a != b:
+            # (t x_i - x_(i+1)) (x_i^b x_(i+1)^a - x^exps) / (x_i - x_(i+1))
+            low = min(a, b)
+            sign = -1 if a > b else 1
+            for k in range(abs(a - b)):
+                for d_i, d_j, coeff in ((1, 0, t), (0, 1, -1)):
+                    new = list(exps)
+                    new[i] = low + k + d_i
+                    new[i+1] = low + abs(a - b) - 1 - k + d_j
+                    _add(out, tuple(new), sign * coeff)
+        self._T[key] = out
+        return out
+
+    def hecke_T(self, poly, i):
+        """Apply the Hecke generator T_i, acting on x_i and x_(i+1)."""
+        out = {}
+        for exps, coeff in poly.items():
+            for image, image_coeff in self._T_on_monomial(exps, i).items():
+                _add(out, image, coeff * image_coeff)
+        return out
+
+    def E(self, eta):
+        """Return E_eta as a dict, with the coefficient of x^eta equal to 1."""
+        eta = tuple(eta)
+        if eta in self._E:
+            return self._E[eta]
+        if eta[-1] > 0:
+            zeta = (eta[-1] - 1,) + eta[:-1]
+            poly = phi(self.E(zeta), self._q)
+        else:
+            # The last descent of eta, which is the image of an ascent
+            i = max(j for j in range(self.N - 1) if eta[j] > eta[j+1])
+            zeta = eta[:i] + (eta[i+1], eta[i]) + eta[i+2:]
+            E_zeta = self.E(zeta)
+            spectrum = spectral_vector(zeta, self._q, self._t)
+            c = (1 - self._t) / (1 - spectrum[i+1] / spectrum[i])
+            poly = self.hecke_T(E_zeta, i)
+            for exps, coeff in E_zeta.items():
+                _add(poly, exps, c * coeff)
+        leading = poly[eta]
+        poly = {exps: coeff / leading for exps, coeff in poly.items()}
+        self._E[eta] = poly
+        return poly
+
+    def symmetrize(self, poly, start=0):
+        """Apply U^+, the sum of the T_w for w permuting x_(start+1)..x_N."""
+        r"""
+        With `R_k = 1 + T_{k-1} + T_{k-1} T_{k-2} + \cdots`, the sum over
+        the permutations is `R_2 R_3 \cdots R_N`, each `R_k` being
+        applied in Horner form.
+        """
+        for k in range(self.N, start + 1, -1):
+            out = dict(poly)
+            for i in range(start, k - 1):
+                out = self.hecke_T(out, i)
+                for exps, coeff in poly.items():
+                    _add(out, exps, coeff)
+            poly = out
+        return poly
+
+
+def _permutation_sign(perm):
+    """Return the sign of a permutation given as a tuple."""
+    sign = 1
+    for i in range(len(perm)):
+        for j in range(i + 1, len(perm)):
+            if perm[i] > perm[j]:
+                sign = -sign
+    return sign
+
+
+def monomial_coefficient(poly, fermions, bosons, N):
+    """Return the antisymmetrized coefficient of a superpartition in poly."""
+    r"""
+    ``poly`` is `U^+ E_\eta`, symmetric in its last `N - m` variables.
+    Up to a factor which only depends on the sector, this is the
+    coefficient of `m_\Omega` in the superpolynomial.
+    """
+    m = len(fermions)
+    bosons = tuple(bosons) + (0,) * (N - m - len(bosons))
+    out = 0
+    for perm in itertools.permutations(range(m)):
+        exps = tuple(fermions[k] for k in perm) + bosons
+        if exps in poly:
+            out += _permutation_sign(perm) * poly[exps]
+    return out
+
+
+# The polynomials of each process, by (N, q, t)
+_engines = {}
+
+
+def _row(task):
+    """Worker: return the coefficients of P_Lambda on some monomials."""
+    r"""
+    ``task`` is ``(spart, keys, N, q, t)``, the superpartitions being
+    pairs (fermionic parts, bosonic parts). The result is normalized so
+    that the coefficient of ``spart`` is 1.
+    """
+    spart, keys, N, q, t = task
+    if (N, q, t) not in _engines:
+        _engines[(N, q, t)] = NonSymmetricMacdonald(N, q, t)
+    engine = _engines[(N, q, t)]
+    fermions, bosons = spart
+    m = len(fermions)
+    padding = (0,) * (N - m - len(bosons))
+    eta = tuple(reversed(fermions)) + padding + tuple(reversed(bosons))
+    poly = engine.symmetrize(engine.E(eta), start=m)
+    leading = monomial_coefficient(poly, fermions, bosons, N)
+    return [monomial_coefficient(poly, key[0], key[1], N) / leading
+            for key in keys]
+
+
+def ns_macdonald_rows(rows, N, q, t, processes=None):
+    """Return the monomial coefficients of Macdonald superpolynomials."""
+    r"""
+    INPUT:
+
+    - ``rows`` -- a list of pairs ``(spart, keys)``, the superpartitions
+      being pairs of tuples (fermionic parts, bosonic parts)
+    - ``N`` -- the number of variables, at least the length of the keys
+    - ``q``, ``t`` -- the parameters, in the ring of the coefficients
+    - ``processes`` -- (default: ``None``) number of worker processes,
+      ``None`` lets ``multiprocessing`` decide and ``1`` disables the pool
+
+    Return the list, row by row, of the coefficients of `P_\Lambda` on
+    the monomials of ``keys``.
+    """
+    tasks = [(spart, keys, N, q, t) for spart, keys in rows]
+    pool = None
+    if processes != 1 and len(tasks) > 1:
+        pool = Pool(processes)
+    try:
+        return map_tasks(_row, tasks, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
@@ -0,0 +1,168 @@
+"""Approximate Jack and Macdonald sectors in floating point with NumPy."""
+r"""
+To explore sectors too large for the exact computations (the sparsity
+pattern of the transition matrix, the magnitudes of its coefficients),
+the parameters are given floating-point values and the sector is
+orthogonalized in ``float64``:
+
+- the monomials of the sector are the rows of the dense matrix ``A`` of
+  their powersum coordinates, in the computing order (the reversed
+  dominance order), and the scalar product is the vector ``w`` of the
+  weights `z_\Lambda(\alpha)` or `z_\Lambda(q, t)`;
+- the rows are orthogonalized by the modified Gram-Schmidt procedure in
+  the weighted scalar product, one vectorized update of the remaining
+  rows per pivot (``method='mgs'``), or by a Householder QR decomposition
+  of `A W^{1/2}` when the weights have the same sign (``method='qr'``).
+
+The result is the unit lower triangular matrix ``C``: row `i` gives the
+superpolynomial of the `i`-th superpartition on the monomials. The entries
+below a tolerance are dropped, and a ``FloatSector`` keeps the others as
+three arrays (row rank, column rank, value) indexed by the ranks of
+``sector_superpartitions``. Its error estimate is the largest cosine
+between two of the computed vectors, and it can be compared with the
+exact rows of the small sectors.
+"""
+import numpy
+
+
+def jack_weights(sparts, alpha):
+    """Return the array of the weights alpha^len * z_Lambda."""
+    alpha = float(alpha)
+    return numpy.array([alpha**len(sp) * float(sp.z_lambda())
+                        for sp in sparts])
+
+
+def macdonald_weights(sparts, q, t):
+    """Return the array of the weights z_Lambda(q, t)."""
+    r"""
+    The sign `(-1)^{m(m-1)/2}` of ``z_lambda_qt`` is the same for the
+    whole sector and is left out.
+    """
+    q, t = float(q), float(t)
+    out = []
+    for sp in sparts:
+        weight = q**sp[0].degree() * float(sp.z_lambda())
+        for part in sp[1]:
+            weight *= (1 - q**part) / (1 - t**part)
+        out.append(weight)
+    return numpy.array(out)
+
+
+def dense_transition(to_p, order):
+    """Return the rows of order of the dict {(row, col): coeff} as an array."""
+    position = {rank: k for k, rank in enumerate(order)}
+    A = numpy.zeros((len(order), len(order)))
+    for (row, col), coeff in to_p.items():
+        A[position[row], col] = float(coeff)
+    return A
+
+
+def orthogonalize(A, w, method='mgs'):
+    """Return (C, norms), C unit lower triangular orthogonalizing A."""
+    r"""
+    The rows of ``C A`` are orthogonal for the scalar product
+    `\langle x, y \rangle = \sum_k x_k y_k w_k`, and ``norms`` are their
+    squared norms.
+    """
+    size = A.shape[0]
+    if method == 'qr':
+        sign = numpy.sign(w[0]) if size else 1.
+        if numpy.any(sign * w <= 0):
+            raise ValueError("The QR method needs weights of one sign.")
+        # A W^(1/2) = L Q^T, the orthogonal rows are diag(L) Q^T
+        L = numpy.linalg.qr((A * numpy.sqrt(sign * w)).T, mode='r').T
+        diag = numpy.diag(L).copy()
+        C = numpy.linalg.solve(L.T, numpy.diag(diag)).T
+        return C, sign * diag**2
+    if method != 'mgs':
+        raise ValueError("Unknown method " + str(method) + ".")
+    V = numpy.array(A, dtype=float)
+    C = numpy.identity(size)
+    norms = numpy.zeros(size)
+    for i in range(size):
+        norms[i] = numpy.dot(V[i] * w, V[i])
+        if norms[i] == 0:
+            raise ZeroDivisionError("The vector " + str(i) + " is isotropic.")
+        factors = V[i+1:].dot(V[i] * w) / norms[i]
+        V[i+1:] -= numpy.outer(factors, V[i])
+        C[i+1:] -= numpy.outer(factors, C[i])
+    return C, norms
+
+
+def orthogonality_error(C, A, w):
+    """Return the largest |cosine| between two rows of C A."""
+    V = C.dot(A)
+    G = (V * w).dot(V.T)
+    scale = numpy.sqrt(numpy.abs(numpy.diag(G)))
+    cosines = numpy.abs(G) / numpy.outer(scale, scale)
+    numpy.fill_diagonal(cosines, 0)
+    return float(cosines.max()) if len(cosines) else 0.
+
+
+class FloatSector(object):
+    """A sector of superpolynomials with floating-point coefficients."""
+
+    def __init__(self, sector, sparts, rows, cols, values, error):
+        """Initialize from the ranks and values of the nonzero entries."""
+        self.sector = sector
+        self.sparts = sparts
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.error = error
+
+    def __repr__(self):
+        return "Floating-point sector {} ({} entries, error {:.1e})".format(
+            self.sector, len(self.values), self.error)
+
+    def dense(self):
+        """Return the transition matrix as a dense array."""
+        out = numpy.zeros((len(self.sparts), len(self.sparts)))
+        out[self.rows, self.cols] = self.values
+        return out
+
+    def to_dict(self):
+        """Return the dict {spart: {spart: coeff}}, as the caches."""
+        out = {}
+        for row, col, value in zip(self.rows, self.cols, self.values):
+            out.setdefault(self.sparts[row], {})[self.sparts[col]] = value
+        return out
+
+    def compare(self, exact, to_float=float):
+        """Return the largest absolute and relative errors on exact rows."""
+        r"""
+        ``exact`` is a dict {spart: {spart: coeff}} of exact rows, possibly
+        partial, whose coefficients are converted by ``to_float``.
+        """
+        ranks = {spart: k for k, spart in enumerate(self.sparts)}
+        approx = self.dense()
+        abs_error, rel_error = 0., 0.
+        for spart, row in exact.items():
+            for key, coeff in row.items():
+                value = to_float(coeff)
+                diff = abs(approx[ranks[spart], ranks[key]] - value)
+                abs_error = max(abs_error, diff)
+                if value != 0:
+                    rel_error = max(rel_error, diff / abs(value))
+        return abs_error, rel_error
+
+
+def float_sector(sector, sparts, order, to_p, weights, method='mgs',
+                 tolerance=1e-12):
+    """Orthogonalize a sector in floating point, return a FloatSector."""
+    r"""
+    ``sparts`` are the superpartitions indexed by their rank, ``order``
+    the ranks in the computing order, ``to_p`` the dict {(row, col):
+    coeff} of the monomials on the powersums and ``weights`` the array of
+    the weights by rank. The entries smaller than ``tolerance`` times
+    the largest entry of their row are dropped.
+    """
+    A = dense_transition(to_p, order)
+    C, norms = orthogonalize(A, weights, method)
+    error = orthogonality_error(C, A, weights)
+    scale = numpy.abs(C).max(axis=1)
+    kept = numpy.abs(C) > tolerance * scale[:, None]
+    row_pos, col_pos = numpy.nonzero(kept)
+    order = numpy.array(order, dtype=int)
+    return FloatSector(sector, sparts, order[row_pos], order[col_pos],
+                       C[row_pos, col_pos], error)
@@ -0,0 +1,200 @@
+"""Specializations and limits of the parameters q, t and alpha."""
+r"""
+The coefficients of the Jack and Macdonald superpolynomials live in
+fraction fields such as `\QQ(q, t, \alpha)`. The functions of this module
+substitute and take limits of the parameters directly on the numerator
+and denominator polynomials, using valuations and leading coefficients,
+so that no conversion to the symbolic ring is needed.
+
+A specialization is given as a sequence of steps, each step being a
+string of one of the forms
+
+- ``'q=t'``, ``'q=t^2'``, ``'alpha=3/2'`` -- substitution of a
+  polynomial expression for a parameter
+- ``'t->0'``, ``'t->1'``, ``'t->oo'``, ``'q->-1'`` -- limit of a parameter
+  towards a rational number or infinity (``'oo'`` or ``'infinity'``)
+
+For instance ``['q=t', 't->0']`` gives the Schur limit of the Macdonald
+superpolynomials and ``['q=t^2', 't->1']`` the Jack limit at alpha=1/2.
+"""
+from sage.rings.rational_field import QQ
+from sage.rings.infinity import Infinity
+
+
+def parse_step(step):
+    """Return ('subs', name, expr) or ('limit', name, point) from a string."""
+    if '->' in step:
+        name, point = [x.strip() for x in step.split('->')]
+        if point in ['oo', '+oo', 'infinity', 'Infinity']:
+            point = Infinity
+        else:
+            point = QQ(point)
+        return ('limit', name, point)
+    if '=' in step:
+        name, expr = [x.strip() for x in step.split('=')]
+        return ('subs', name, expr.replace('**', '^'))
+    raise ValueError("Invalid specialization step: " + str(step))
+
+
+def _poly_dict(f):
+    """Return the dict {exponent tuple: coeff} of a polynomial."""
+    if f.parent().ngens() == 1:
+        return {(e,): c for e, c in f.dict().items()}
+    return {tuple(e): c for e, c in f.dict().items()}
+
+
+def _from_dict(R, dic):
+    """Rebuild a polynomial of R from a dict {exponent tuple: coeff}."""
+    if R.ngens() == 1:
+        return R({e[0]: c for e, c in dic.items()})
+    return R(dic)
+
+
+def _extreme_part(f, index, lowest=True):
+    """Return (exponent, coeff) of the lowest or highest power of a var."""
+    r"""
+    The coefficient is a polynomial of the same ring which does not
+    depend on the variable of position ``index``.
+    """
+    dic = _poly_dict(f)
+    exps = [e[index] for e in dic]
+    the_exp = min(exps) if lowest else max(exps)
+    part = {}
+    for e, c in dic.items():
+        if e[index] == the_exp:
+            new_e = list(e)
+            new_e[index] = 0
+            part[tuple(new_e)] = c
+    return the_exp, _from_dict(f.parent(), part)
+
+
+def _limit_pair(num, den_data, index, point):
+    """Limit of num/den when the variable goes to 0 or infinity."""
+    r"""
+    ``den_data`` is the pair (exponent, coefficient) of the denominator,
+    computed once for all the numerators sharing this denominator.
+    """
+    if num == 0:
+        return num, num.parent().one()
+    lowest = point == 0
+    num_exp, num_coeff = _extreme_part(num, index, lowest)
+    den_exp, den_coeff = den_data
+    if num_exp == den_exp:
+        return num_coeff, den_coeff
+    if (num_exp > den_exp) == lowest:
+        zero = num.parent().zero()
+        return zero, num.parent().one()
+    raise ValueError("The limit is infinite.")
+
+
+def specialize_pairs(pairs, steps, R):
+    """Apply specialization steps to a list of (numerator, denominator)."""
+    r"""
+    The numerators and denominators are polynomials of ``R``. The pairs
+    sharing a denominator are processed as one batch: the denominator is
+    substituted, and its valuation and leading coefficient are computed,
+    only once per step.
+    """
+    pairs = list(pairs)
+    names = R.variable_names()
+    gens = R.gens()
+    for step in steps:
+        kind, name, value = parse_step(step)
+        if name not in names:
+            raise ValueError("Unknown parameter " + name + ".")
+        index = names.index(name)
+        var = gens[index]
+        if kind == 'subs':
+            value = R(value)
+        elif point_is_finite(value) and value != 0:
+            # We move the point to 0
+            kind, value = 'shift', var + value
+        new_dens = {}
+        new_pairs = []
+        for num, den in pairs:
+            if kind in ['subs', 'shift']:
+                if den not in new_dens:
+                    new_dens[den] = den.subs(**{name: value})
+                    if new_dens[den] == 0:
+                        raise ZeroDivisionError(
+                            "The specialization is a pole.")
+                num = num.subs(**{name: value})
+                new_pairs.append((num, new_dens[den]))
+            else:
+                if den not in new_dens:
+                    new_dens[den] = _extreme_part(den, index,
+                                                  lowest=(value == 0))
+                new_pairs.append(
+                    _limit_pair(num, new_dens[den], index, value))
+        # A shift is always followed by the limit towards 0
+        if kind == 'shift':
+            pairs = new_pairs
+            new_dens = {}
+            new_pairs = []
+            for num, den in pairs:
+                if den not in new_dens:
+                    new_dens[den] = _extreme_part(den, index)
+                new_pairs.append(_limit_pair(num, new_dens[den], index, 0))
+        pairs = new_pairs
+    return pairs
+
+
+def point_is_finite(point):
+    """Tell whether a limit point is finite."""
+    return point != Infinity
+
+
+def polynomial_ring(BR):
+    """Return the polynomial ring of the parameters, None if there is none."""
+    # Fields of numbers such as QQ or GF(p) are their own base ring
+    if BR.base_ring() is BR:
+        return None
+    if BR.is_field():
+        return BR.ring()
+    return BR
+
+
+def to_ring(poly, target):
+    """Convert a polynomial to target, matching the variables by name."""
+    if poly.is_constant():
+        return target(poly.constant_coefficient())
+    names = poly.parent().variable_names()
+    target_gens = target.gens_dict()
+    out = target.zero()
+    for exps, coeff in _poly_dict(poly).items():
+        term = target(coeff)
+        for name, exp in zip(names, exps):
+            if exp == 0:
+                continue
+            if name not in target_gens:
+                raise ValueError("The parameter " + name +
+                                 " is not in the target ring.")
+            term *= target_gens[name]**exp
+        out += term
+    return out
+
+
+def specialize_coefficients(coeffs, steps, target=None):
+    """Specialize a list of coefficients of a fraction field."""
+    r"""
+    Return the list of specialized coefficients as elements of ``target``
+    (by default the parent of the coefficients).
+    """
+    coeffs = list(coeffs)
+    if len(coeffs) == 0:
+        return []
+    BR = coeffs[0].parent()
+    if target is None:
+        target = BR
+    R = polynomial_ring(BR)
+    if R is None:
+        return [target(c) for c in coeffs]
+    if BR.is_field():
+        pairs = [(R(c.numerator()), R(c.denominator())) for c in coeffs]
+    else:
+        pairs = [(R(c), R.one()) for c in coeffs]
+    pairs = specialize_pairs(pairs, steps, R)
+    out = []
+    for num, den in pairs:
+        out.append(to_ring(num, target) / to_ring(den, target))
+    return out
@@ -0,0 +1,157 @@
+"""Structure constants of the non-multiplicative bases."""
+r"""
+The product of two Schur, SchurBar, SchurStar, SchurBarStar, Jack or
+Macdonald superpolynomials has no combinatorial formula in the basis
+itself. The structure constants
+
+.. MATH::
+
+    B_\Lambda B_\Omega = \sum_\Gamma c_{\Lambda\Omega}^\Gamma B_\Gamma
+
+are computed here for a whole pair of sectors at once: both factors
+are expanded on the monomial basis with the sparse sector transition
+matrices, multiplied with the monomial structure constants, and the
+result is brought back with the inverse transition matrix of the
+product sector. The tables are saved in the directory ``structure`` of
+the cache directory (see ``cache_store.py``) and the most recently used
+ones are kept in memory. A table is computed under the lock of its file
+and written to a temporary file which is then renamed, so that the
+processes sharing the directory never read a partial table.
+"""
+import os
+import re
+from collections import OrderedDict
+from sage.structure.sage_object import load
+from sage.modules.free_module_element import vector
+from cache_store import cache_root, FileLock, _atomic_save
+
+
+def ring_key(ring):
+    """Return a string usable in file names that identifies a ring."""
+    return re.sub('[^A-Za-z0-9]+', '_', str(ring)).strip('_')
+
+
+class LRUCache(object):
+    """Dict keeping only the most recently used entries."""
+
+    def __init__(self, maxsize=64):
+        """Initialize an empty cache."""
+        self._data = OrderedDict()
+        self.maxsize = maxsize
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        value = self._data.pop(key)
+        self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._data:
+            self._data.pop(key)
+        self._data[key] = value
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry."""
+        self._data.clear()
+
+
+class StructureConstants(object):
+    """Structure constants of one basis, computed per pair of sectors."""
+
+    def __init__(self, Sym, basis, maxsize=64, directory=None):
+        """Initialize the service for the basis named basis of Sym."""
+        r"""
+        ``directory`` defaults to the directory ``structure`` of
+        ``cache_root()``.
+        """
+        self._Sym = Sym
+        self._basis = basis
+        self._tables = LRUCache(maxsize)
+        if directory is None:
+            directory = os.path.join(cache_root(), 'structure')
+        self._directory = directory
+
+    def _filename(self, sector1, sector2):
+        """Return the file of the table of a pair of sectors."""
+        name = '{}_{}_{}_{}_{}_{}'.format(
+            self._basis, self._Sym._namespace(),
+            sector1[0], sector1[1], sector2[0], sector2[1])
+        return os.path.join(self._directory, name)
+
+    def sector_pair(self, sector1, sector2):
+        """Return {(spart1, spart2): {spart: coeff}} for two sectors."""
+        key = (tuple(sector1), tuple(sector2))
+        if key in self._tables:
+            return self._tables[key]
+        filename = self._filename(*key)
+        if not os.path.exists(filename + '.sobj'):
+            if not os.path.isdir(self._directory):
+                try:
+                    os.makedirs(self._directory)
+                except OSError:
+                    # Created by another process in the meantime
+                    if not os.path.isdir(self._directory):
+                        raise
+            with FileLock(filename + '.lock'):
+                # Another process may have computed it while we waited
+                if not os.path.exists(filename + '.sobj'):
+                    _atomic_save(self._compute(*key),
+                                 '{}.{}'.format(filename, os.getpid()),
+                                 filename)
+        table = load(filename)
+        self._tables[key] = table
+        return table
+
+    def _compute(self, sector1, sector2):
+        """Compute the structure constants of a pair of sectors."""
+        Sym = self._Sym
+        M = Sym.Monomial()
+        BR = Sym.base_ring()
+        sector3 = (sector1[0] + sector2[0], sector1[1] + sector2[1])
+        sparts1 = Sym.sector_superpartitions(sector1)
+        sparts2 = Sym.sector_superpartitions(sector2)
+        sparts3 = Sym.sector_superpartitions(sector3)
+        ranks3 = Sym._sector_ranks(sector3)
+        to_m1 = Sym.transition_matrix(self._basis, 'Monomial', sector1)
+        to_m2 = Sym.transition_matrix(self._basis, 'Monomial', sector2)
+        from_m3 = Sym.transition_matrix('Monomial', self._basis, sector3)
+        rows1 = [to_m1.row(k).dict() for k in range(len(sparts1))]
+        rows2 = [to_m2.row(k).dict() for k in range(len(sparts2))]
+
+        # Monomial structure constants, as sparse vectors of sector3
+        mono_prods = {}
+
+        def mono_prod(a, b):
+            if (a, b) not in mono_prods:
+                the_prod = M.product_on_basis(sparts1[a], sparts2[b])
+                mono_prods[(a, b)] = {ranks3[spart]: coeff
+                                      for spart, coeff in the_prod}
+            return mono_prods[(a, b)]
+
+        table = {}
+        for i, row1 in enumerate(rows1):
+            for j, row2 in enumerate(rows2):
+                in_m = {}
+                for a, coeff_a in row1.items():
+                    for b, coeff_b in row2.items():
+                        coeff_ab = coeff_a * coeff_b
+                        for rank, coeff in mono_prod(a, b).items():
+                            in_m[rank] = in_m.get(rank, 0) + coeff_ab * coeff
+                in_m = vector(BR, len(sparts3), in_m, sparse=True)
+                in_basis = (in_m * from_m3).dict()
+                table[(sparts1[i], sparts2[j])] = {
+                    sparts3[rank]: coeff
+                    for rank, coeff in in_basis.items()}
+        return table
+
+    def product(self, left, right):
+        """Return the dict {spart: coeff} of the product of two elements."""
+        table = self.sector_pair(left.sector(), right.sector())
+        return table[(left, right)]
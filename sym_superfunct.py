@@ -27,12 +27,33 @@ from sage.rings.all import Integer
 from sage.arith.all import gcd, lcm
 # from sage.symbolic.assumptions import assume
 # from sage.misc.flatten import flatten
-from sage.structure.sage_object import load, save
 from sage.matrix.constructor import Matrix
 from sage.interfaces.singular import singular
 from sage.sets.set import Set
 from sage.combinat.partition import Partition
 from sage.combinat.sf.sf import SymmetricFunctions
+from multimodular import multimodular_inverse
+from specialization import specialize_coefficients, to_ring
+from coercion_graph import CoercionGraph
+from sage.modules.free_module_element import vector
+from sage.rings.fraction_field import FractionField_generic
+import os
+import time
+from structure_constants import StructureConstants, ring_key
+from cache_store import CacheStore, LazyCache, cache_root
+from coefficient_codec import CoefficientDecoder, CompactSector
+from gram_schmidt import SectorGramSchmidt
+from interpolation import interpolate_sector, rational_constants
+from macdonald_modular import modular_macdonald_sector
+from eigenoperators import D_on_powersum, Delta_on_powersum, eigen_row
+from ns_macdonald import ns_macdonald_rows
+from factored import FactoredFractions
+from numeric_backend import float_sector, jack_weights, macdonald_weights
+from evaluation import BatchEvaluator, jack_factor, macdonald_factor
+
+
+# Bases whose elements depend on the parameters q, t or alpha
+_PARAMETRIC_BASES = ['Jack', 'Macdonald', 'Galpha', 'Gqt']
 
 
 def unique_permutations(seq):
@@ -100,9 +121,27 @@ def unique_perm_list_elements(lst):
 class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     """The Class of Symmetric superfunctions."""
 
-    def __init__(self, some_ring):
+    def __init__(self, some_ring, cache_dir=None, **parameters):
         """Initialize the algebra, cache and realizations."""
+        r"""
+        The parameters ``alpha``, ``q`` and ``t`` are the generators of
+        the same name of ``some_ring``, unless they are given a value as
+        keyword arguments: ``SymSuperfunctionsAlgebra(QQ, alpha=3/2)`` or
+        ``SymSuperfunctionsAlgebra(GF(p), q=2, t=3)`` compute the Jack or
+        Macdonald superpolynomials directly over the numbers, with caches
+        of their own (over ``GF(p)``, ``p`` must be larger than the
+        degrees, the powersums being used).
+
+        The caches are kept in ``cache_dir``, by default the environment
+        variable ``SUPER_CACHE_DIR`` or ``./super_cache``, which may be
+        shared by several processes (see ``cache_store.py``).
+        """
         self._base = some_ring
+        if cache_dir is None:
+            cache_dir = cache_root()
+        self._cache_dir = cache_dir
+        self._parameters = {name: some_ring(value)
+                            for name, value in parameters.items()}
         my_cat = Algebras(some_ring)
         Parent.__init__(self,
                         category=my_cat.WithRealizations())
@@ -110,6 +149,27 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         self._Macdo_m_cache = {}
         self._Schur_m_cache = {}
         self._SchurBar_m_cache = {}
+        # The Schur caches have rational coefficients, the Jack and
+        # Macdonald ones are kept by base ring and parameters
+        decoder = CoefficientDecoder(some_ring, self._parameters)
+        self._cache_stores = {name: CacheStore(name, cache_dir, name,
+                                               decoder)
+                              for name in ['Schur_m', 'SchurBar_m']}
+        for name in ['Jack_m', 'Macdo_m']:
+            self._cache_stores[name] = CacheStore(
+                name + '_' + self._namespace(), cache_dir,
+                legacy=None if self._parameters else name, decoder=decoder,
+                compact=True)
+        # The monomial expansions of the cached rows, see _cached_to_m
+        self._m_elements = {name: {} for name in self._cache_stores}
+        self._coercion_graph = CoercionGraph()
+        self._structure_constants = {}
+        # Measured costs of the edges, see _edge_cost
+        self._edge_costs = {}
+        self._edge_rates = {}
+        # Engine used for each computation task, with its options
+        self._engines = {task: (engines[0], {})
+                         for task, engines in self._engine_choices.items()}
         # attribute intialization
         # Construction of morphisms between bases
         # ...
@@ -150,13 +210,18 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         self._m_to_e = ~(self._e_to_m)
 
         # Coercion classical bases
-        self._p_to_m.register_as_coercion()
-        self._m_to_p.register_as_coercion()
-        self._h_to_m.register_as_coercion()
-        self._h_to_p.register_as_coercion()
-        self._p_to_h.register_as_coercion()
-        self._e_to_m.register_as_coercion()
-        self._m_to_e.register_as_coercion()
+        self._register_coercion(self._p_to_m, 'Powersum', 'Monomial',
+                                matrix=self.TM_p_to_m)
+        self._register_coercion(self._m_to_p, 'Monomial', 'Powersum',
+                                inverse_of=True)
+        self._register_coercion(self._h_to_m, 'Homogeneous', 'Monomial')
+        self._register_coercion(self._h_to_p, 'Homogeneous', 'Powersum')
+        self._register_coercion(self._p_to_h, 'Powersum', 'Homogeneous',
+                                inverse_of=True)
+        self._register_coercion(self._e_to_m, 'Elementary', 'Monomial',
+                                matrix=self.TM_e_to_m)
+        self._register_coercion(self._m_to_e, 'Monomial', 'Elementary',
+                                inverse_of=True)
 
         # Schur Basis
         # self._Schur_to_m = self._Schur.module_morphism(
@@ -217,32 +282,45 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         # self._Schur_to_m.register_as_coercion()
         # self._m_to_Schur.register_as_coercion()
         # Now coercion from Pieri rules
-        self._Schur_to_p.register_as_coercion()
-        self._p_to_Schur.register_as_coercion()
+        self._register_coercion(self._Schur_to_p, 'Schur', 'Powersum',
+                                matrix=self.TM_Schur_to_p)
+        self._register_coercion(self._p_to_Schur, 'Powersum', 'Schur',
+                                matrix=self.TM_p_to_Schur)
         # self._SchurBar_to_m.register_as_coercion()
         # self._m_to_SchurBar.register_as_coercion()
-        self._SchurStar_to_h.register_as_coercion()
-        self._h_to_SchurStar.register_as_coercion()
-
-        self._e_to_SchurBar.register_as_coercion()
-        self._SchurBar_to_e.register_as_coercion()
-
-        self._p_to_SchurBarStar.register_as_coercion()
-        self._SchurBarStar_to_p.register_as_coercion()
+        self._register_coercion(self._SchurStar_to_h, 'SchurStar',
+                                'Homogeneous', matrix=self.TM_SchurStar_to_h)
+        self._register_coercion(self._h_to_SchurStar, 'Homogeneous',
+                                'SchurStar', matrix=self.TM_h_to_SchurStar)
+
+        self._register_coercion(self._e_to_SchurBar, 'Elementary',
+                                'SchurBar', matrix=self.TM_e_to_SchurBar)
+        self._register_coercion(self._SchurBar_to_e, 'SchurBar',
+                                'Elementary', matrix=self.TM_SchurBar_to_e)
+
+        self._register_coercion(self._p_to_SchurBarStar, 'Powersum',
+                                'SchurBarStar',
+                                matrix=self.TM_p_to_SchurBarStar)
+        self._register_coercion(self._SchurBarStar_to_p, 'SchurBarStar',
+                                'Powersum',
+                                matrix=self.TM_SchurBarStar_to_p)
+
+        # The monomial expansions of the Schur are not coercions but
+        # their sector matrices are known
+        self._coercion_graph.add_edge('Schur', 'Monomial',
+                                      matrix=self.TM_Schur_to_m)
+        self._coercion_graph.add_edge('SchurBar', 'Monomial',
+                                      matrix=self.TM_SchurBar_to_m)
 
         # self._SchurBar_to_SchurStar.register_as_coercion()
         # self._SchurStar_to_SchurBar.register_as_coercion()
         # self._SchurBarStar_to_Schur.register_as_coercion()
         # self._Schur_to_SchurBarStar.register_as_coercion()
-        try:
-            self._Schur_m_cache = load('./super_cache/Schur_m')
-            self._SchurBar_m_cache = load('./super_cache/SchurBar_m')
-        except:
-            self._Schur_m_cache = dict({})
-            self._SchurBar_m_cache = dict({})
+        self._Schur_m_cache = self._cache_stores['Schur_m'].lazy_load()
+        self._SchurBar_m_cache = self._cache_stores['SchurBar_m'].lazy_load()
 
         # One parameter bases
-        if 'alpha' in some_ring.variable_names():
+        if self._has_parameter('alpha'):
             # Galpha basis
             self._Galpha = self.Galpha()
             self._galpha_to_p = self._Galpha.module_morphism(
@@ -250,36 +328,34 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                 codomain=self._P, category=category)
             self._p_to_galpha = ~(self._galpha_to_p)
 
-            self._galpha_to_p.register_as_coercion()
-            self._p_to_galpha.register_as_coercion()
+            self._register_coercion(self._galpha_to_p, 'Galpha',
+                                    'Powersum')
+            self._register_coercion(self._p_to_galpha, 'Powersum',
+                                    'Galpha', inverse_of=True)
 
             # Jack polynomials
-            try:
-                self._Jack_m_cache = load('./super_cache/Jack_m')
-            except:
-                self._Jack_m_cache = dict({})
+            self._Jack_m_cache = self._cache_stores['Jack_m'].lazy_load()
             self._Jack = self.Jack()
             self._Jack_to_m = self._Jack.module_morphism(
                 self.morph_Jack_to_m, triangular='upper', invertible=True,
                 codomain=self._M, category=category)
             self._m_to_Jack = ~(self._Jack_to_m)
-            self._Jack_to_m.register_as_coercion()
-            self._m_to_Jack.register_as_coercion()
+            self._register_coercion(self._Jack_to_m, 'Jack', 'Monomial')
+            self._register_coercion(self._m_to_Jack, 'Monomial', 'Jack',
+                                    inverse_of=True)
 
         # Handling the macdonald
-        try:
-            self._Macdo_m_cache = load('./super_cache/Macdo_m')
-        except:
-            self._Macdo_m_cache = dict({})
-        var_names = some_ring.variable_names()
-        if 'q' in var_names and 't' in var_names:
+        self._Macdo_m_cache = self._cache_stores['Macdo_m'].lazy_load()
+        if self._has_parameter('q') and self._has_parameter('t'):
             self._Macdo = self.Macdonald()
             self._Macdo_to_m = self._Macdo.module_morphism(
                 self.morph_Macdo_to_m, triangular='upper', invertible=True,
                 codomain=self._M, category=category)
             self._m_to_Macdo = ~(self._Macdo_to_m)
-            self._Macdo_to_m.register_as_coercion()
-            self._m_to_Macdo.register_as_coercion()
+            self._register_coercion(self._Macdo_to_m, 'Macdonald',
+                                    'Monomial')
+            self._register_coercion(self._m_to_Macdo, 'Monomial',
+                                    'Macdonald', inverse_of=True)
 
             # Gqt
             self._Gqt = self.Gqt()
@@ -288,8 +364,9 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                 codomain=self._P, category=category)
             self._p_to_gqt = ~(self._gqt_to_p)
 
-            self._gqt_to_p.register_as_coercion()
-            self._p_to_gqt.register_as_coercion()
+            self._register_coercion(self._gqt_to_p, 'Gqt', 'Powersum')
+            self._register_coercion(self._p_to_gqt, 'Powersum', 'Gqt',
+                                    inverse_of=True)
 
     _shorthands = ['m', 'h', 'p', 'e']
 
@@ -381,7 +458,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         boso_list = [list(Superpartitions(k, 0)) for k in spart[1]]
         spart_sets_list = ferm_list + boso_list
         BR = P.base_ring()
-        alpha = BR.gens_dict()['alpha']
+        alpha = self._parameter('alpha')
         gns_plambda = [
             P.linear_combination(
                 (P(spart), BR(1/(P.z_lambda_alpha(spart, alpha))))
@@ -401,8 +478,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         ferm_list = [list(Superpartitions(k, 1)) for k in spart[0]]
         boso_list = [list(Superpartitions(k, 0)) for k in spart[1]]
         spart_sets_list = ferm_list + boso_list
-        BR = P.base_ring()
-        params = BR.gens()
+        params = (self._parameter('q'), self._parameter('t'))
         gns_plambda = [
             P.linear_combination(
                 (P(spart), BR(1/(P.z_lambda_qt(spart, parameters=params))))
@@ -413,29 +489,47 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         sign = (-1)**(ferm_deg*(ferm_deg-1)/2)
         return sign*the_prod
 
+    def _classical_to_m(self, which, spart):
+        """Return the monomial expansion of a classical basis element."""
+        r"""
+        Without circles, the Jack, Macdonald, Schur and SchurBar
+        superpolynomials are the classical `P_\lambda(\alpha)`,
+        `P_\lambda(q, t)` and `s_\lambda` (both Schur being the limits of
+        `P_\lambda(q, q)`). They are computed, and cached, by Sage's
+        ``SymmetricFunctions``. Return the dict {spart: coeff} of
+        ``spart`` on the monomials.
+        """
+        BR = self.base_ring()
+        if which in ['Schur', 'SchurBar']:
+            Sf = SymmetricFunctions(QQ)
+            basis = Sf.schur()
+        else:
+            Sf = SymmetricFunctions(BR)
+            if which == 'Jack':
+                basis = Sf.jack(t=self._parameter('alpha')).P()
+            else:
+                basis = Sf.macdonald(q=self._parameter('q'),
+                                     t=self._parameter('t')).P()
+        expansion = Sf.monomial()(basis(Partition(list(spart[1]))))
+        return {_Superpartitions([[], list(mu)]): coeff
+                for mu, coeff in expansion.monomial_coefficients().items()}
+
     def morph_Jack_to_m(self, spart):
         """Return the monomial expansion of the Jack given spart."""
         # Here if the Jack is already cached, we return it
         # If not, we use the GramSchmidt procedure to obtain it
         if spart == _Superpartitions([[], []]):
             return self._M(1)
+        if spart.fermionic_degree() == 0:
+            return self._M._from_dict(self._classical_to_m('Jack', spart),
+                                      coerce=True)
         sector = spart.sector()
         Jack_m_cache = self._Jack_m_cache
-        M = self._M
-        BR = M.base_ring()
-        if sector in Jack_m_cache:
-            the_dict = Jack_m_cache[sector][spart]
-        else:
+        if sector not in Jack_m_cache or spart not in Jack_m_cache[sector]:
             print("The expansion of this Jack superpolynomial" +
                   " was not precomputed.")
-            sect_dict = self._Jack._gram_sector(*sector)
-            self._update_cache(sector, sect_dict, which_cache='Jack_m')
-            the_dict = sect_dict[spart]
-        spart_coeff = the_dict.items()
-        mono_coeff = ((M(a_spart), BR(str(coeff)))
-                      for a_spart, coeff in spart_coeff)
-        out = M.linear_combination(mono_coeff)
-        return out
+            self._gram_missing(self._Jack, spart, 'Jack_m')
+        return self._cached_to_m('Jack_m', spart)
 
     def morph_Macdo_to_m(self, spart):
         """Return the monomial expansion of the Jack given spart."""
@@ -443,23 +537,96 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         # If not, we use the GramSchmidt procedure to obtain it
         if spart == _Superpartitions([[], []]):
             return self._M(1)
+        if spart.fermionic_degree() == 0:
+            return self._M._from_dict(
+                self._classical_to_m('Macdonald', spart), coerce=True)
         sector = spart.sector()
         Macdo_m_cache = self._Macdo_m_cache
-        M = self._M
-        BR = M.base_ring()
-        if sector in Macdo_m_cache:
-            the_dict = Macdo_m_cache[sector][spart]
-        else:
+        if (sector not in Macdo_m_cache or
+                spart not in Macdo_m_cache[sector]):
             print("The expansion of this Macdonald superpolynomial" +
                   " was not precomputed.")
-            sect_dict = self._Macdo._gram_sector(*sector)
-            self._update_cache(sector, sect_dict, which_cache='Macdo_m')
-            the_dict = sect_dict[spart]
-        spart_coeff = the_dict.items()
-        mono_coeff = ((M(a_spart), BR(coeff))
-                      for a_spart, coeff in spart_coeff)
-        out = M.linear_combination(mono_coeff)
-        return out
+            self._gram_missing(self._Macdo, spart, 'Macdo_m')
+        return self._cached_to_m('Macdo_m', spart)
+
+    def _cached_to_m(self, which_cache, spart):
+        """Return the element of the monomial basis of a cached row."""
+        r"""
+        The rows of the sector of ``spart`` in ``which_cache`` are
+        converted to the monomial basis at once, and kept, the first time
+        one of them is asked for; those of a compact sector, decoded on
+        demand, one by one. The coefficients are usually in the
+        base ring already (see ``coefficient_codec.py``); those which
+        do not coerce are parsed from their string.
+        """
+        elements = self._m_elements[which_cache]
+        if spart not in elements:
+            M = self._M
+            BR = M.base_ring()
+            rows = self._cache(which_cache)[spart.sector()]
+            sparts = rows
+            if isinstance(rows, CompactSector):
+                sparts = [spart]
+            for a_spart in sparts:
+                if a_spart in elements:
+                    continue
+                row = rows[a_spart]
+                try:
+                    elements[a_spart] = M._from_dict(dict(row), coerce=True)
+                except TypeError:
+                    elements[a_spart] = M._from_dict(
+                        {key: BR(str(coeff)) for key, coeff in row.items()})
+        return elements[spart]
+
+    def _gram_missing(self, basis, spart, which_cache):
+        """Compute the monomial expansion of spart missing from a cache."""
+        r"""
+        The rows already in the cache for the sector of ``spart`` are
+        reused. Depending on the engine of the task ``which_cache`` (see
+        ``set_engine``), either the dominance down-set of ``spart`` or
+        the whole sector is computed. The new rows are written to the
+        cache one by one (see ``stream_sector``), which may thus hold
+        partial sectors. An engine which fails returns ``None`` and we
+        fall back to Gram-Schmidt.
+        """
+        sector = spart.sector()
+        cache = self._cache(which_cache)
+        store = self._cache_stores[which_cache]
+        with store.lock(sector):
+            # Another process may have computed it while we waited
+            cache.refresh(sector)
+            if spart not in cache.get(sector, {}):
+                self._gram_compute(basis, spart, which_cache)
+        return cache[sector][spart]
+
+    def _gram_compute(self, basis, spart, which_cache):
+        """Compute spart as in _gram_missing, under the sector lock."""
+        sector = spart.sector()
+        cache = self._cache(which_cache)
+        engine, options = self._engines[which_cache]
+        new_rows = None
+        if engine == 'interpolation':
+            new_rows = basis._interpolate_sector(*sector, **options)
+        elif engine == 'modular':
+            new_rows = basis._modular_sector(*sector, **options)
+        elif engine == 'eigenoperators':
+            targets = None if options.get('sector', False) else [spart]
+            new_rows = basis._eigen_sector(*sector, targets=targets)
+        elif engine == 'nonsymmetric':
+            targets = None if options.get('sector', False) else [spart]
+            new_rows = basis._ns_sector(
+                *sector, targets=targets,
+                processes=options.get('processes', None))
+        if new_rows is None:
+            targets = [spart] if engine == 'down_set' else None
+            for a_spart, row in self.stream_sector(which_cache, sector,
+                                                   targets=targets):
+                pass
+        else:
+            with self._cache_stores[which_cache].sink(cache,
+                                                      sector) as sink:
+                for a_spart, row in new_rows.items():
+                    sink.write(a_spart, row)
 
     @staticmethod
     def _schur_qt_limit(coeff, lim):
@@ -468,29 +635,13 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         if coeff in QQ:
             return coeff
 
-        # Now we must extract the ring from the coeff
-        BR = coeff.parent()
-        # This is a dictionnary with q, t and alpha
-        parameters = BR.gens_dict()
-        q = parameters['q']
-        t = parameters['t']
-
-        # Now we need to convert our coefficient to the symbolic ring
-        coeff_SR = SR(coeff)
-        # We also need a version of the parameters on the symbolic ring
-        q_SR = SR(q)
-        t_SR = SR(t)
-
-        # We can now do the substitution since it is allowed on the
-        # symbolic ring
-        coeff_SR_q = coeff_SR.subs({q_SR: t_SR})
-
-        # And here, one must understand that the limit is computed
-        # by GAP and that the limit argument is sent by sage as a
-        # string. So instead of writing t_SR = 1, we must write
-        # t = 1 since t_SR is represented as the string 't'
-        # in the equations
-        coeff_lim = coeff_SR_q.limit(t=lim)
+        # We set q=t and take the limit on t directly on the numerator
+        # and denominator of the coefficient, see specialization.py
+        if lim == Infinity:
+            limit_step = 't->oo'
+        else:
+            limit_step = 't->' + str(lim)
+        coeff_lim = specialize_coefficients([coeff], ['q=t', limit_step])[0]
 
         return coeff_lim
 
@@ -686,6 +837,292 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         ]
         return sbarstar.linear_combination(s_coeff)
 
+    # The first engine of each list is the default one
+    _engine_choices = {
+        'TM': ['dense', 'multimodular'],
+        'Schur_m': ['pieri', 'macdonald'],
+        'Jack_m': ['down_set', 'sector', 'interpolation', 'eigenoperators'],
+        'Macdo_m': ['down_set', 'sector', 'modular', 'nonsymmetric'],
+    }
+
+    def set_engine(self, task, engine, **options):
+        """Choose the engine used for a computation task."""
+        r"""
+        The tasks and their engines are
+
+        - ``'TM'`` -- inversion of the transition matrices, either
+          ``'dense'`` for the usual ``Matrix(QQ).inverse()`` or
+          ``'multimodular'`` for :func:`multimodular_inverse`, whose
+          keyword arguments are the options (``processes=8`` say)
+        - ``'Schur_m'`` -- monomial expansion of the Schur and SchurBar
+          sectors missing from the cache, either ``'pieri'`` for the
+          product of the Pieri transition matrices or ``'macdonald'``
+          for the q=t limits of the Macdonald superpolynomials
+        - ``'Jack_m'``, ``'Macdo_m'`` -- monomial expansion of the Jack
+          and Macdonald superpolynomials missing from the cache, either
+          ``'down_set'`` to orthogonalize only the superpartitions
+          dominated by the requested one or ``'sector'`` for the whole
+          sector at once, both with the options ``factored=True`` to
+          compute with factored denominators, ``processes``,
+          ``chunk_size`` to share the projections between processes and
+          ``checkpoint_dir``, ``out_of_core`` for long runs (see
+          ``_gram_schmidt``);
+          the Jack polynomials may also be computed with
+          ``'interpolation'`` (see ``Jack._interpolate_sector``) or
+          ``'eigenoperators'`` (see ``Jack._eigen_sector``, with the
+          option ``sector=True`` for whole sectors) and the
+          Macdonald polynomials with ``'modular'`` (see
+          ``Macdonald._modular_sector``) or ``'nonsymmetric'`` (see
+          ``Macdonald._ns_sector``, with the options ``sector=True`` and
+          ``processes``)
+
+        The engines ``'interpolation'`` and ``'modular'`` are not
+        available when the parameters are specialized. The cached results
+        of the previous engine are cleared.
+        """
+        if engine not in self._engine_choices.get(task, []):
+            raise ValueError("Unknown engine for " + str(task) + ".")
+        if engine in ['interpolation', 'modular'] and self._parameters:
+            raise ValueError("The engine " + engine + " interpolates in "
+                             "the parameters, which are specialized.")
+        self._engines[task] = (engine, options)
+        if task == 'TM':
+            cached = [self.TM_Schur_to_p, self.TM_SchurBarStar_to_p,
+                      self.TM_SchurStar_to_h, self.TM_SchurBar_to_e,
+                      self.TM_Schur_to_SchurBarStar,
+                      self.TM_SchurStar_to_SchurBar]
+        else:
+            cached = []
+        for method in cached:
+            method.clear_cache()
+
+    def set_TM_engine(self, engine='dense', **options):
+        """Choose the engine used to invert the transition matrices."""
+        self.set_engine('TM', engine, **options)
+
+    def _TM_inverse(self, TM):
+        """Invert a transition matrix with the selected engine."""
+        engine, options = self._engines['TM']
+        # The multi-modular engine is for matrices over QQ only
+        if engine == 'multimodular' and TM.base_ring() is QQ:
+            return multimodular_inverse(TM, **options)
+        return TM.inverse()
+
+    def _register_coercion(self, morphism, source, target, **edge_data):
+        """Register a morphism as a coercion and add it to the graph."""
+        morphism.register_as_coercion()
+        self._coercion_graph.add_edge(source, target, morphism=morphism,
+                                      **edge_data)
+
+    # Prefixes of the bases, so that they can be named as printed
+    _basis_aliases = {
+        'm': 'Monomial', 'p': 'Powersum', 'h': 'Homogeneous',
+        'e': 'Elementary', 'galpha': 'Galpha', 'gqt': 'Gqt',
+        's': 'Schur', 'sbar': 'SchurBar', 'sStar': 'SchurStar',
+        'sbarStar': 'SchurBarStar', 'Palpha': 'Jack', 'Pqt': 'Macdonald'}
+
+    def _basis_name(self, basis):
+        """Return the name of a basis given as a name, prefix or parent."""
+        if isinstance(basis, six.string_types):
+            return self._basis_aliases.get(basis, basis)
+        return basis._realization_name()
+
+    @cached_method
+    def sector_superpartitions(self, sector):
+        """Return the superpartitions of a sector, indexed by their rank."""
+        r"""
+        This is the ordering of the rows and columns of every sector
+        transition matrix.
+        """
+        return tuple(Superpartitions(*sector))
+
+    @cached_method
+    def _sector_ranks(self, sector):
+        """Return the dict {spart: rank} of a sector."""
+        sparts = self.sector_superpartitions(sector)
+        return {sparts[k]: k for k in range(len(sparts))}
+
+    # Default cost model of the edges: (seconds, exponent) such that
+    # building the matrix of a sector of size k takes seconds*k^exponent
+    _default_edge_rates = {
+        'matrix': (1e-4, 2),
+        'morphism': (1e-3, 2),
+        'inverse': (1e-6, 3)}
+    # Time spent per non-zero entry when applying a built matrix
+    _apply_rate = 1e-6
+
+    @staticmethod
+    def _edge_kind(edge):
+        """Return 'inverse', 'matrix' or 'morphism'."""
+        if edge.get('inverse_of'):
+            return 'inverse'
+        if edge.get('matrix') is not None:
+            return 'matrix'
+        return 'morphism'
+
+    def _edge_cost(self, source, target, sector):
+        """Estimate the time needed to go through an edge for a sector."""
+        r"""
+        Once the matrix of the edge is built for the sector, the cost is
+        the measured cost of applying it, proportional to its number of
+        non-zero entries. Otherwise it is the time needed to build it,
+        estimated from the rate measured on other sectors for the same
+        pair of bases, or from the default cost model.
+        """
+        key = (source, target, sector)
+        if key in self._edge_costs:
+            return self._edge_costs[key]
+        edge = self._coercion_graph.edge(source, target)
+        kind = self._edge_kind(edge)
+        size = len(self.sector_superpartitions(sector))
+        rate, exponent = self._edge_rates.get(
+            (source, target), self._default_edge_rates[kind])
+        cost = rate * size**exponent + self._apply_rate * size**2
+        if kind == 'inverse':
+            cost += self._edge_cost(target, source, sector)
+        return cost
+
+    @cached_method
+    def _edge_matrix(self, source, target, sector):
+        """Return the sector matrix of an edge of the coercion graph."""
+        start = time.time()
+        BR = self.base_ring()
+        edge = self._coercion_graph.edge(source, target)
+        kind = self._edge_kind(edge)
+        if kind == 'matrix':
+            TM = Matrix(BR, edge['matrix'](sector), sparse=True)
+        elif kind == 'inverse':
+            inverse = self._edge_matrix(target, source, sector)
+            forward = self._coercion_graph.edge(target, source)
+            if self._edge_kind(forward) == 'matrix':
+                # Inverted over its own ring (QQ for the TM_* edges), so
+                # that the multi-modular engine applies
+                inverse = forward['matrix'](sector)
+            # The forward edge is timed, and counted, on its own
+            start = time.time()
+            TM = Matrix(BR, self._TM_inverse(inverse), sparse=True)
+        else:
+            morphism = edge['morphism']
+            origin = getattr(self, source)()
+            codomain = getattr(self, target)()
+            sparts = self.sector_superpartitions(sector)
+            ranks = self._sector_ranks(sector)
+            entries = {}
+            for row, spart in enumerate(sparts):
+                image = codomain(morphism(origin(spart)))
+                for a_spart, coeff in image:
+                    entries[(row, ranks[a_spart])] = coeff
+            size = len(sparts)
+            TM = Matrix(BR, size, size, entries, sparse=True)
+        # We record the measured costs for the planner
+        size = TM.nrows()
+        if size > 0:
+            exponent = self._default_edge_rates[kind][1]
+            elapsed = time.time() - start
+            self._edge_rates[(source, target)] = (
+                elapsed / size**exponent, exponent)
+        self._edge_costs[(source, target, sector)] = (
+            self._apply_rate * len(TM.dict()))
+        return TM
+
+    def conversion_path(self, source, target, sector):
+        """Return the planned conversion path and its estimated cost."""
+        r"""
+        Return a pair (path, cost) where path is the list of the bases
+        the conversion goes through and cost the estimated time in
+        seconds, given the edge matrices already built. The path used
+        by ``transition_matrix`` and ``convert`` is the one planned the
+        first time the sector is converted.
+        """
+        source = self._basis_name(source)
+        target = self._basis_name(target)
+        sector = tuple(sector)
+
+        def cost(start, end):
+            return self._edge_cost(start, end, sector)
+        return self._coercion_graph.cheapest_path(source, target, cost)
+
+    @cached_method
+    def _transition_matrix(self, source, target, sector):
+        """Compose the edge matrices along the cheapest path."""
+        path, _ = self.conversion_path(source, target, sector)
+        BR = self.base_ring()
+        size = len(self.sector_superpartitions(sector))
+        if len(path) == 1:
+            return Matrix(BR, size, size, {(k, k): 1 for k in range(size)},
+                          sparse=True)
+        TM = self._edge_matrix(path[0], path[1], sector)
+        for start, end in zip(path[1:], path[2:]):
+            TM = TM * self._edge_matrix(start, end, sector)
+        return TM
+
+    def structure_constants(self, basis):
+        """Return the structure constants service of a basis."""
+        r"""
+        See ``structure_constants.StructureConstants``, the service is
+        shared by every product computed in this basis.
+        """
+        name = self._basis_name(basis)
+        if name not in self._structure_constants:
+            self._structure_constants[name] = StructureConstants(
+                self, name,
+                directory=os.path.join(self._cache_dir, 'structure'))
+        return self._structure_constants[name]
+
+    def convert(self, element, target):
+        """Convert an element to another basis along planned paths."""
+        r"""
+        Each sector of ``element`` is converted with the composed matrix
+        of the cheapest path of the coercion graph for this sector
+        (see ``conversion_path``), which is cached for later calls.
+        """
+        source = self._basis_name(element.parent())
+        target = self._basis_name(target)
+        codomain = getattr(self, target)()
+        BR = self.base_ring()
+        by_sector = {}
+        for spart, coeff in element:
+            by_sector.setdefault(spart.sector(), []).append((spart, coeff))
+        out = {}
+        for sector, terms in by_sector.items():
+            TM = self._transition_matrix(source, target, sector)
+            ranks = self._sector_ranks(sector)
+            sparts = self.sector_superpartitions(sector)
+            coeffs = vector(BR, len(sparts),
+                            {ranks[spart]: coeff for spart, coeff in terms},
+                            sparse=True)
+            for rank, coeff in (coeffs * TM).dict().items():
+                out[sparts[rank]] = coeff
+        return codomain._from_dict(out)
+
+    def transition_matrix(self, source, target, sector, output='matrix'):
+        """Return the transition matrix between two bases for a sector."""
+        r"""
+        Row `i` of the matrix is the expansion of the basis element of
+        ``source`` indexed by the `i`-th superpartition of
+        ``sector_superpartitions(sector)`` on the basis ``target``.
+
+        INPUT:
+
+        - ``source``, ``target`` -- bases given as parents (``Sym.Jack()``),
+          names (``'Jack'``) or prefixes (``'Palpha'``, ``'m'``, ...)
+        - ``sector`` -- the pair (bosonic degree, fermionic degree)
+        - ``output`` -- (default: ``'matrix'``) either ``'matrix'`` for a
+          sparse Sage matrix over the base ring or ``'dict'`` for the dict
+          {(row, column): coeff} of the non-zero entries
+
+        The matrix is obtained by composing the cached sector matrices of
+        the morphisms along the cheapest path of the coercion graph (see
+        ``conversion_path``), and memoized per (source, target, sector)
+        for this base ring.
+        """
+        source = self._basis_name(source)
+        target = self._basis_name(target)
+        TM = self._transition_matrix(source, target, tuple(sector))
+        if output == 'dict':
+            return TM.dict()
+        return TM
+
     # Since the Sage morphism inversion only works on diagonal matrix
     # of transition, we build the matrices and invert them
     # This might be sub-optimal
@@ -704,7 +1141,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_Schur_to_p(self, sector):
         """Return the transition matrix s -> p."""
         TMps = self.TM_p_to_Schur(sector)
-        TM = TMps.inverse()
+        TM = self._TM_inverse(TMps)
         return TM
 
     @cached_method
@@ -722,7 +1159,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_SchurBarStar_to_p(self, sector):
         """Return the transition matrix s -> p."""
         TMps = self.TM_p_to_SchurBarStar(sector)
-        TM = TMps.inverse()
+        TM = self._TM_inverse(TMps)
         return TM
 
     @cached_method
@@ -740,7 +1177,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_SchurStar_to_h(self, sector):
         """Return the transition matrix s* -> p."""
         TMps = self.TM_h_to_SchurStar(sector)
-        TM = TMps.inverse()
+        TM = self._TM_inverse(TMps)
         return TM
 
     @cached_method
@@ -758,7 +1195,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_SchurBar_to_e(self, sector):
         """Return the transition matrix s* -> p."""
         TMps = self.TM_e_to_SchurBar(sector)
-        TM = TMps.inverse()
+        TM = self._TM_inverse(TMps)
         return TM
 
     @cached_method
@@ -778,7 +1215,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_Schur_to_SchurBarStar(self, sector):
         """Return the transition matrix Schur to SchurBarStar."""
         TM = self.TM_SchurBarStar_to_Schur(sector)
-        TM = TM.inverse()
+        TM = self._TM_inverse(TM)
         return TM
 
     @cached_method
@@ -798,112 +1235,302 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
     def TM_SchurStar_to_SchurBar(self, sector):
         """Return the transition matrix SchurStar to SchurBar."""
         TM_sb_ss = self.TM_SchurBar_to_SchurStar(sector)
-        TM = TM_sb_ss.inverse()
+        TM = self._TM_inverse(TM_sb_ss)
+        return TM
+
+    @cached_method
+    def TM_p_to_m(self, sector):
+        """Return the transition matrix p -> m."""
+        sparts = Superpartitions(*sector)
+        exprs = [self.morph_p_to_m(spart) for spart in sparts]
+        TM = [
+            [expr.coefficient(spart) for spart in sparts]
+            for expr in exprs]
+        TM = Matrix(QQ, TM)
         return TM
 
+    @cached_method
+    def TM_e_to_m(self, sector):
+        """Return the transition matrix e -> m."""
+        sparts = Superpartitions(*sector)
+        exprs = [self.morph_e_to_m(spart) for spart in sparts]
+        TM = [
+            [expr.coefficient(spart) for spart in sparts]
+            for expr in exprs]
+        TM = Matrix(QQ, TM)
+        return TM
+
+    @cached_method
+    def TM_Schur_to_m(self, sector):
+        """Return the transition matrix s -> m."""
+        # s = TM_Schur_to_p * p and p = TM_p_to_m * m
+        return self.TM_Schur_to_p(sector) * self.TM_p_to_m(sector)
+
+    @cached_method
+    def TM_SchurBar_to_m(self, sector):
+        """Return the transition matrix sbar -> m."""
+        # sbar = TM_SchurBar_to_e * e and e = TM_e_to_m * m
+        return self.TM_SchurBar_to_e(sector) * self.TM_e_to_m(sector)
+
+    @staticmethod
+    def _TM_to_dict(TM, sector):
+        """Return the rows of a sector matrix as {spart: {spart: coeff}}."""
+        return dict(SymSuperfunctionsAlgebra._TM_rows(TM, sector))
+
+    @staticmethod
+    def _TM_rows(TM, sector):
+        """Yield the rows of a sector matrix as (spart, {spart: coeff})."""
+        sparts = list(Superpartitions(*sector))
+        for i in range(len(sparts)):
+            yield sparts[i], {sparts[j]: TM[i, j]
+                              for j in range(len(sparts))
+                              if TM[i, j] != 0}
+
+    def _Schur_m_sector(self, sector, which='Schur'):
+        """Return the monomial expansion of a Schur or SchurBar sector."""
+        return dict(self._Schur_m_rows(sector, which))
+
+    def _Schur_m_rows(self, sector, which='Schur'):
+        """Yield the rows of the monomial expansion of a Schur sector."""
+        engine, _ = self._engines['Schur_m']
+        if engine == 'macdonald':
+            return self._Schur_m_rows_from_Macdo(sector, which)
+        if which == 'Schur':
+            TM = self.TM_Schur_to_m(sector)
+        else:
+            TM = self.TM_SchurBar_to_m(sector)
+        return self._TM_rows(TM, sector)
+
+    def _Schur_m_sector_from_Macdo(self, sector, which='Schur'):
+        """Obtain a Schur or SchurBar sector as a limit of Macdonald."""
+        return dict(self._Schur_m_rows_from_Macdo(sector, which))
+
+    def _Schur_m_rows_from_Macdo(self, sector, which='Schur'):
+        """Yield the rows of a Schur sector, as limits of Macdonald."""
+        # The Schur is the q=t, t->0 limit and the SchurBar
+        # is the q=t, t->infinity limit
+        if which == 'Schur':
+            lim = 0
+        else:
+            lim = Infinity
+
+        def schur_case(coeff):
+            return SymSuperfunctionsAlgebra._schur_qt_limit(coeff, lim)
+
+        # We define everything we need to obtain the Schur
+        # from the monomial function
+        _QQqt = QQ['q', 't'].fraction_field()
+        _Symqt = SymSuperfunctionsAlgebra(_QQqt)
+        _Macdo = _Symqt.Macdonald()
+        _mono = _Symqt.Monomial()
+
+        # To update the cache, we have to compute the whole
+        # sector.
+        for a_spart in Superpartitions(*sector):
+            yield a_spart, (_mono(_Macdo(a_spart))
+                            ).map_coefficients(
+                                schur_case).monomial_coefficients()
+
+    def validate_Schur_m_cache(self, which='Schur', sectors=None):
+        """Compare the cached Schur expansions with the Pieri engine."""
+        r"""
+        Return the list of the cached sectors of ``Schur_m`` (or
+        ``SchurBar_m`` if ``which='SchurBar'``) that differ from the
+        product of the Pieri transition matrices. An empty list means
+        that the two engines agree.
+        """
+        if which == 'Schur':
+            cache = self._Schur_m_cache
+        else:
+            cache = self._SchurBar_m_cache
+        if sectors is None:
+            sectors = list(cache.keys())
+        mismatches = []
+        for sector in sectors:
+            if sector == (0, 0):
+                continue
+            if which == 'Schur':
+                TM = self.TM_Schur_to_m(sector)
+            else:
+                TM = self.TM_SchurBar_to_m(sector)
+            expected = self._TM_to_dict(TM, sector)
+            cached = cache[sector]
+            same = len(cached) == len(expected)
+            for spart in expected:
+                if not same:
+                    break
+                row = {a_spart: QQ(coeff)
+                       for a_spart, coeff in cached[spart].items()
+                       if coeff != 0}
+                same = row == expected[spart]
+            if not same:
+                mismatches.append(sector)
+        return mismatches
+
+    def validate_Jack_m_cache(self, sectors=None):
+        """Compare the cached Jack expansions with the eigenoperators."""
+        r"""
+        Return the list of the cached sectors of ``Jack_m`` in which a
+        row differs from the eigenfunction of D and Delta computed by
+        ``Jack._eigen_sector``. An empty list means that Gram-Schmidt
+        and the eigenoperators agree.
+        """
+        cache = self._Jack_m_cache
+        BR = self.base_ring()
+        if sectors is None:
+            sectors = list(cache.keys())
+        mismatches = []
+        for sector in sectors:
+            if sector == (0, 0):
+                continue
+            cached = cache[sector]
+            expected = self._Jack._eigen_sector(*sector,
+                                                targets=list(cached))
+            if expected is None:
+                # Nothing to compare with
+                continue
+            for spart in cached:
+                row = {a_spart: BR(coeff)
+                       for a_spart, coeff in cached[spart].items()
+                       if coeff != 0}
+                expected_row = {a_spart: coeff
+                                for a_spart, coeff in expected[spart].items()
+                                if coeff != 0}
+                if row != expected_row:
+                    mismatches.append(sector)
+                    break
+        return mismatches
+
+    def validate_Macdo_m_cache(self, sectors=None, processes=None):
+        """Compare the cached Macdonald expansions with the ns Macdonald."""
+        r"""
+        Return the list of the cached sectors of ``Macdo_m`` in which a
+        row differs from the symmetrization of the non-symmetric
+        Macdonald polynomial computed by ``Macdonald._ns_sector``. An
+        empty list means that Gram-Schmidt and the construction agree.
+        """
+        cache = self._Macdo_m_cache
+        BR = self.base_ring()
+        if sectors is None:
+            sectors = list(cache.keys())
+        mismatches = []
+        for sector in sectors:
+            if sector == (0, 0):
+                continue
+            cached = cache[sector]
+            expected = self._Macdo._ns_sector(*sector, targets=list(cached),
+                                              processes=processes)
+            if expected is None:
+                mismatches.append(sector)
+                continue
+            for spart in cached:
+                row = {a_spart: BR(coeff)
+                       for a_spart, coeff in cached[spart].items()
+                       if coeff != 0}
+                expected_row = {a_spart: coeff
+                                for a_spart, coeff in expected[spart].items()
+                                if coeff != 0}
+                if row != expected_row:
+                    mismatches.append(sector)
+                    break
+        return mismatches
+
     def morph_Schur_to_m(self, spart):
         """Return the monomial expansion of the Schur given spart."""
-        # Obtain it from cache, if not cached obtain it as
-        # the limit of the Macdonald
+        # Obtain it from cache, if not cached compute the whole
+        # sector with the selected engine
         if spart == _Superpartitions([[], []]):
             return self._M(1)
+        if spart.fermionic_degree() == 0:
+            return self._M._from_dict(self._classical_to_m('Schur', spart),
+                                      coerce=True)
         sector = spart.sector()
         Schur_m_cache = self._Schur_m_cache
-        M = self._M
-        BR = M.base_ring()
-        if sector in Schur_m_cache:
-            the_dict = Schur_m_cache[sector][spart]
-        else:
+        if sector not in Schur_m_cache or spart not in Schur_m_cache[sector]:
             print("The expansion of this Schur superpolynomial" +
                   " was not precomputed.")
-
-            def schur_case(coeff):
-                return SymSuperfunctionsAlgebra._schur_qt_limit(coeff, 0)
-
-            # We define everything we need to obtain the Schur
-            # from the monomial function
-            _QQqt = QQ['q', 't'].fraction_field()
-            _Symqt = SymSuperfunctionsAlgebra(_QQqt)
-            _Macdo = _Symqt.Macdonald()
-            _mono = _Symqt.Monomial()
-
-            # To update the cache, we have to compute the whole
-            # sector.
-            sparts = Superpartitions(*sector)
-            sect_dict = {
-                a_spart:
-                (_mono(_Macdo(a_spart))
-                 ).map_coefficients(schur_case).monomial_coefficients()
-                for a_spart in sparts
-            }
-
-            self._update_cache(sector, sect_dict, which_cache='Schur_m')
-            the_dict = sect_dict[spart]
-        spart_coeff = the_dict.items()
-        mono_coeff = ((M(a_spart), BR(coeff))
-                      for a_spart, coeff in spart_coeff)
-        out = M.linear_combination(mono_coeff)
-        return out
+            for a_spart, row in self.stream_sector('Schur_m', sector):
+                pass
+        return self._cached_to_m('Schur_m', spart)
 
     def morph_SchurBar_to_m(self, spart):
         """Return the monomial expansion of the Schur given spart."""
         if spart == _Superpartitions([[], []]):
             return self._M(1)
+        if spart.fermionic_degree() == 0:
+            return self._M._from_dict(
+                self._classical_to_m('SchurBar', spart), coerce=True)
         sector = spart.sector()
         Schur_m_cache = self._SchurBar_m_cache
-        M = self._M
-        BR = M.base_ring()
-        if sector in Schur_m_cache:
-            the_dict = Schur_m_cache[sector][spart]
-        else:
+        if sector not in Schur_m_cache or spart not in Schur_m_cache[sector]:
             print("The expansion of this SchurBar superpolynomial" +
                   " was not precomputed.")
+            for a_spart, row in self.stream_sector('SchurBar_m', sector):
+                pass
+        return self._cached_to_m('SchurBar_m', spart)
 
-            def schurbar_case(coeff):
-                return SymSuperfunctionsAlgebra._schur_qt_limit(
-                    coeff, Infinity)
-
-            # We define everything we need to obtain the Schur
-            # from the monomial function
-            _QQqt = QQ['q', 't'].fraction_field()
-            _Symqt = SymSuperfunctionsAlgebra(_QQqt)
-            _Macdo = _Symqt.Macdonald()
-            _mono = _Symqt.Monomial()
-
-            # To update the cache, we have to compute the whole
-            # sector.
-            sparts = Superpartitions(*sector)
-            sect_dict = {
-                a_spart:
-                (_mono(_Macdo(a_spart))
-                 ).map_coefficients(schurbar_case).monomial_coefficients()
-                for a_spart in sparts
-            }
-
-            self._update_cache(sector, sect_dict, which_cache='SchurBar_m')
-            the_dict = sect_dict[spart]
-        spart_coeff = the_dict.items()
-        # Here we must make sure that the coefficient is cast back
-        # into the coeff ring. It will generate errors otherwise.
-        mono_coeff = ((M(a_spart), BR(coeff))
-                      for a_spart, coeff in spart_coeff)
-        out = M.linear_combination(mono_coeff)
-        return out
+    def _cache(self, which_cache):
+        """Return the dict of the cache which_cache."""
+        return {'Jack_m': self._Jack_m_cache,
+                'Macdo_m': self._Macdo_m_cache,
+                'Schur_m': self._Schur_m_cache,
+                'SchurBar_m': self._SchurBar_m_cache}[which_cache]
 
-    def _update_cache(self, sector, cache_extension, which_cache=None):
-        """Update and write to disk the cache of an object."""
-        if which_cache == 'Jack_m':
-            self._Jack_m_cache[sector] = cache_extension
-            save(self._Jack_m_cache, filename='./super_cache/Jack_m')
-        if which_cache == 'Macdo_m':
-            self._Macdo_m_cache[sector] = cache_extension
-            save(self._Macdo_m_cache, filename='./super_cache/Macdo_m')
-        if which_cache == 'Schur_m':
-            self._Schur_m_cache[sector] = cache_extension
-            save(self._Schur_m_cache, filename='./super_cache/Schur_m')
-        if which_cache == 'SchurBar_m':
-            self._SchurBar_m_cache[sector] = cache_extension
-            save(self._SchurBar_m_cache, filename='./super_cache/SchurBar_m')
+    def preload_caches(self, sectors=None, caches=None, background=True):
+        """Load sectors of the caches ahead of their use."""
+        r"""
+        The caches are read lazily, sector by sector, see
+        ``cache_store.py``. This loads the ``sectors`` (by default all
+        of them) of the ``caches`` (by default ``'Jack_m'``,
+        ``'Macdo_m'``, ``'Schur_m'`` and ``'SchurBar_m'``), in a
+        background thread unless ``background=False``. Return the list
+        of the threads.
+        """
+        if caches is None:
+            caches = ['Jack_m', 'Macdo_m', 'Schur_m', 'SchurBar_m']
+        threads = [self._cache(name).preload(sectors, background)
+                   for name in caches
+                   if isinstance(self._cache(name), LazyCache)]
+        return [thread for thread in threads if thread is not None]
+
+    def stream_sector(self, which_cache, sector, targets=None):
+        """Yield the rows (spart, {spart: coeff}) of a sector of a cache."""
+        r"""
+        The rows of ``which_cache`` (``'Jack_m'``, ``'Macdo_m'``,
+        ``'Schur_m'`` or ``'SchurBar_m'``) are computed one by one, with
+        the default engines, and each one is yielded as soon as it is
+        known. It is also written to the cache, in memory and in the
+        journal of its ``CacheStore``, so that the whole sector is never
+        held twice. For the Jack and Macdonald polynomials, the rows
+        already in the cache are reused and ``targets`` restricts the
+        computation as in ``_gram_schmidt``.
+
+        The lock of the sector is held during the computation, and the
+        rows written meanwhile by other processes are read first. If the
+        sector is then complete, its rows are yielded from the cache.
+        """
+        cache = self._cache(which_cache)
+        store = self._cache_stores[which_cache]
+        with store.lock(sector):
+            cache.refresh(sector)
+            known = dict(cache.get(sector, {}))
+            if len(known) == len(self.sector_superpartitions(sector)):
+                for spart, row in known.items():
+                    yield spart, row
+                return
+            if which_cache in ['Schur_m', 'SchurBar_m']:
+                rows = self._Schur_m_rows(sector, which_cache[:-2])
+            else:
+                basis = {'Jack_m': self._Jack,
+                         'Macdo_m': self._Macdo}[which_cache]
+                engine, options = self._engines[which_cache]
+                if engine not in ('down_set', 'sector'):
+                    options = {}
+                rows = basis._gram_sector_rows(*sector, targets=targets,
+                                               known=known, **options)
+            with store.sink(cache, sector) as sink:
+                for spart, row in sink.consume(rows):
+                    yield spart, row
 
     def a_realization(self):
         """Return the default realization."""
@@ -911,12 +1538,85 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
 
     def _repr_(self):
         out = "Symmetric superfunctions over " + str(self.base_ring())
+        if self._parameters:
+            out += " with " + ", ".join(
+                "{}={}".format(name, self._parameters[name])
+                for name in sorted(self._parameters))
         return out
 
-    def _gram_schmidt(self, n, m, source, scalar,
-                      leading_coeff=None, upper_triangular=True):
+    def _has_parameter(self, name):
+        """Return whether the parameter name is a generator or a value."""
+        if name in self._parameters:
+            return True
+        try:
+            return name in self._base.variable_names()
+        except (AttributeError, ValueError):
+            return False
+
+    def _parameter(self, name):
+        """Return the value of the parameter name, or its generator."""
+        if name in self._parameters:
+            return self._parameters[name]
+        return self._base.gens_dict()[name]
+
+    def _namespace(self):
+        """Return the base ring and parameters as used in file names."""
+        values = ''.join(
+            '_{}{}'.format(name, self._parameters[name])
+            for name in sorted(self._parameters))
+        values = values.replace('-', 'm').replace('/', 'o')
+        return ring_key(self._base) + values
+
+    def _float_sector(self, sector, weights, method='mgs',
+                      tolerance=1e-12):
+        """Orthogonalize a sector in floating point, see numeric_backend."""
+        r"""
+        ``weights`` is a function from the list of the superpartitions of
+        the sector to the array of their weights.
+        """
+        sparts = self.sector_superpartitions(sector)
+        ranks = self._sector_ranks(sector)
+        order = _Superpartitions.sort_by_dominance(list(sparts))
+        order.reverse()
+        to_p = self.transition_matrix('Monomial', 'Powersum', sector,
+                                      output='dict')
+        return float_sector(sector, sparts, [ranks[sp] for sp in order],
+                            to_p, weights(sparts), method=method,
+                            tolerance=tolerance)
+
+    def _float_errors(self, which_cache, approx, point):
+        """Return the errors of a FloatSector against the exact rows."""
+        r"""
+        The exact rows of the sector are computed if needed (see
+        ``stream_sector``) and specialized at ``point``, the dict of the
+        values of the parameters which are not already specialized.
+        """
+        for spart, row in self.stream_sector(which_cache, approx.sector):
+            pass
+        exact = self._cache(which_cache)[approx.sector]
+        point = {name: QQ(value) for name, value in point.items()
+                 if name not in self._parameters}
+        if point:
+            return approx.compare(exact, lambda c: float(c(**point)))
+        return approx.compare(exact)
+
+    def _gram_schmidt(self, n, m, source, scalar, **options):
         """Apply Gram Schmidt procedure for sector given scalar product."""
         r"""
+        Return the dict {spart: {spart: coeff}} of the rows yielded by
+        ``_gram_schmidt_rows``, which takes the same arguments.
+        """
+        return dict(self._gram_schmidt_rows(n, m, source, scalar,
+                                            **options))
+
+    def _gram_schmidt_rows(self, n, m, source, scalar,
+                           leading_coeff=None, upper_triangular=True,
+                           norm=None, targets=None, known=None,
+                           factored=False, processes=1, chunk_size=16,
+                           checkpoint_dir=None, checkpoint_every=50,
+                           out_of_core=False):
+        """Yield the rows of the Gram Schmidt procedure for a sector."""
+        r"""
         This is copied from sage/combinat/sf, adapted for superpartitions.
         Apply Gram-Schmidt to ``source`` with respect to the scalar product
         ``scalar`` for all superpartitions of `n|M`. The scalar product is
@@ -927,9 +1627,13 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
         ring of symmetric functions such that the transition matrix from
         the basis ``source`` to this orthogonal basis is triangular.
 
-        The implementation uses the powersum basis, so this function
-        shouldn't be used unless the base ring is a `\QQ`-algebra
-        (or ``self`` and ``source`` are both the powersum basis).
+        The vectors are kept in powersum coordinates by the engine
+        ``SectorGramSchmidt`` and all the arithmetic is done in the base
+        ring. Each row ``(spart, {spart: coeff})`` is yielded as soon as
+        it is computed. The implementation uses the powersum basis, so
+        this function shouldn't be used unless the base ring is a
+        `\QQ`-algebra (or ``self`` and ``source`` are both the powersum
+        basis).
 
         INPUT:
 
@@ -945,63 +1649,60 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
           coefficients for Gram-Schmidt
         - ``upper_triangular`` -- (defaults to ``True``) boolean, indicates
           whether the transition is upper triangular or not
+        - ``norm`` -- (default: ``None``) a closed formula for the squared
+          norm of the orthogonal vectors, see ``gram_schmidt.py``
+        - ``targets`` -- (default: ``None``) if given, only these
+          superpartitions and the ones they dominate are computed, each
+          one against its comparable predecessors only
+        - ``known`` -- (default: ``None``) a dict of rows already computed
+          (a partial cache), which are reused and not returned
+        - ``factored`` -- (default: ``False``) whether to compute with
+          the ``FactoredFractions`` of the base ring, whose denominators
+          are kept as products of factors (see ``factored.py``); the rows
+          are converted back to the base ring
+        - ``processes`` -- (default: 1) number of worker processes sharing
+          the projections on the orthogonal vectors, ``None`` for all the
+          cores; the results are the same as the sequential ones
+        - ``chunk_size`` -- (default: 16) number of consecutive orthogonal
+          vectors held by each worker, see ``SectorGramSchmidt``
+        - ``checkpoint_dir`` -- (default: ``None``) directory of the
+          checkpoints, saved every ``checkpoint_every`` orthogonal
+          vectors; running the same computation again resumes it from
+          the first unfinished superpartition
+        - ``out_of_core`` -- (default: ``False``) whether to keep the
+          orthogonal vectors in a memory-mapped file instead of memory
 
         EXAMPLES::
             # TODO
         """
-        BR = self.base_ring()
-        one = BR.one()
-        p = source.realization_of().Powersum()
-
-        # Create a function which converts x and y to the power-sum basis
-        # and applies the scalar product.
-        pscalar = (lambda x, y:
-                   p._apply_multi_module_morphism(
-                       p(x), p(y), lambda a, b: scalar(a), orthogonal=True))
-
-        if leading_coeff is None:
-            leading_coeff = lambda x: one
-
-        # We are going to be doing everything like we are in the
-        # upper-triangular case. We list the partitions in "decreasing order"
-        # and work from the beginning forward.
-        # If we are in the lower-triangular case,
-        # then we shouldn't reverse the list.
-        l = list(Superpartitions(n, m))
-        l = _Superpartitions.sort_by_dominance(l)
-        if upper_triangular:
-            l.reverse()
-
-        # precomputed elements
-        precomputed_elements = []
-        cache = dict({})
-        # Handle the initial case
-        cache[l[0]] = {l[0]: leading_coeff(l[0])}
-        precomputed_elements.append(leading_coeff(l[0])*source(l[0]))
-        print("Computing...")
-        total_loops = len(l)
-        for i in range(1, len(l)):
-            print(str(i)+" superpartitions computed out of " +
-                  str(total_loops))
-            start = leading_coeff(l[i])*source(l[i])
-            sub = 0
-            for j in range(i):
-                sub += (
-                    pscalar(start, precomputed_elements[j]) /
-                    pscalar(precomputed_elements[j], precomputed_elements[j]) *
-                    precomputed_elements[j]
-                )
-            res = start - sub
-            res = res.map_coefficients(lambda x: BR(SR(x)))
-
+        ring = None
+        if factored and isinstance(self.base_ring(), FractionField_generic):
+            # Over the numbers, there is nothing to factor
+            ring = FactoredFractions(self.base_ring())
+        else:
+            factored = False
+        checkpoint = None
+        if checkpoint_dir is not None:
+            if not os.path.isdir(checkpoint_dir):
+                os.makedirs(checkpoint_dir)
+            name = '{}_{}_{}_{}'.format(
+                self._namespace(), source.prefix(), n, m)
+            if factored:
+                name += '_factored'
+            checkpoint = os.path.join(checkpoint_dir, name)
+        engine = SectorGramSchmidt.from_algebra(
+            self, n, m, source, scalar, leading_coeff=leading_coeff,
+            upper_triangular=upper_triangular, norm=norm, ring=ring,
+            processes=processes, chunk_size=chunk_size,
+            checkpoint=checkpoint, checkpoint_every=checkpoint_every,
+            out_of_core=out_of_core)
+        for spart, row in engine.rows(targets=targets, known=known):
+            if factored:
+                row = {key: coeff.value() for key, coeff in row.items()}
             if hasattr(self, '_normalize_coefficients'):
-                res = res.map_coefficients(self._normalize_coefficients)
-            precomputed_elements.append(res)
-            # Now, res == precomputed_elements[i]
-            cache[l[i]] = {}
-            for j in range(i+1):
-                cache[l[i]][l[j]] = res.coefficient(l[j])
-        return cache
+                row = {key: self._normalize_coefficients(coeff)
+                       for key, coeff in row.items()}
+            yield spart, row
 
     class Bases(Category_realization_of_parent):
         """General class for bases."""
@@ -1111,6 +1812,46 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     for spart in spart_coeff
                 )
 
+            def specialize_limit(self, *steps, **options):
+                """Specialize and take limits of the parameters of self."""
+                r"""
+                The steps are described in the module ``specialization``,
+                for instance ``P.specialize_limit('q=t', 't->0')`` or
+                ``P.specialize_limit('q=t^2', 't->1')``. The coefficients
+                sharing a denominator are specialized together.
+
+                OPTIONS:
+
+                - ``target_ring`` -- (default: the base ring) the ring of
+                  the coefficients of the result
+                - ``basis`` -- (default: the basis of self, or the monomial
+                  basis if the elements of the basis of self depend on the
+                  parameters) name of the basis in which self is expanded
+                  before its coefficients are specialized
+                """
+                parent = self.parent()
+                Sym = parent.realization_of()
+                basis = options.get('basis', None)
+                if basis is None:
+                    basis = parent._realization_name()
+                    if basis in _PARAMETRIC_BASES:
+                        basis = 'Monomial'
+                source = getattr(Sym, basis)()
+                target_ring = options.get('target_ring', None)
+                if target_ring is None:
+                    target_ring = parent.base_ring()
+                    target = source
+                else:
+                    target_Sym = SymSuperfunctionsAlgebra(target_ring)
+                    target = getattr(target_Sym, basis)()
+                spart_coeff = source(self).monomial_coefficients()
+                spart_coeff = list(spart_coeff.items())
+                coeffs = specialize_coefficients(
+                    [coeff for _, coeff in spart_coeff], steps, target_ring)
+                return target.linear_combination(
+                    (target(spart), coeff)
+                    for (spart, _), coeff in zip(spart_coeff, coeffs))
+
             def subs_coeff(self, sub_dict):
                 """Substitution for paremeters in the coefficients."""
                 return self.map_coefficients(lambda x: x.subs(sub_dict))
@@ -1148,7 +1889,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                 self_p = P(self)
                 alpha = in_alpha
                 if in_alpha is None:
-                    alpha = BR.gens_dict()['alpha']
+                    alpha = parent.realization_of()._parameter('alpha')
                 one = BR.one()
                 out = P._from_dict(
                     {
@@ -1165,9 +1906,8 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                 BR = parent.base_ring()
                 P = parent.realization_of().Powersum()
                 self_p = P(self)
-                params = BR.gens_dict()
-                q = params['q']
-                t = params['t']
+                q = parent.realization_of()._parameter('q')
+                t = parent.realization_of()._parameter('t')
 
                 one = BR.one()
                 out = P._from_dict(
@@ -1203,14 +1943,12 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             def scalar_alpha(self, other, in_alpha=None):
                 """Apply alpha-deformed scalar product."""
                 parent = self.parent()
-                BR = parent.base_ring()
                 P = parent.realization_of().Powersum()
                 self_p = P(self)
                 other_p = P(other)
                 alpha = in_alpha
                 if in_alpha is None:
-                    params = BR.gens_dict()
-                    alpha = params['alpha']
+                    alpha = parent.realization_of()._parameter('alpha')
                     # if hasattr(parent, "alpha"):
                     #     alpha = parent.alpha
                     # else:
@@ -1226,7 +1964,6 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             def scalar_qt(self, other):
                 """Apply qt deformed scalar product."""
                 parent = self.parent()
-                BR = parent.base_ring()
                 P = parent.realization_of().Powersum()
                 self_p = P(self)
                 other_p = P(other)
@@ -1234,9 +1971,8 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     q = parent.q
                     t = parent.t
                 else:
-                    params = BR.gens_dict()
-                    q = params['q']
-                    t = params['t']
+                    q = parent.realization_of()._parameter('q')
+                    t = parent.realization_of()._parameter('t')
 
                 _zee_qt = P.z_lambda_qt
                 out = P._apply_multi_module_morphism(self_p, other_p,
@@ -1279,6 +2015,20 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                          for spart, coeff in dic.iteritems())
             return self.linear_combination(coef_elem)
 
+    class NonMultiplicativeBasis(Basis):
+        """Generic class for bases whose product uses structure constants."""
+
+        def product_on_basis(self, left, right):
+            """Return the product of left and right."""
+            # The unit is handled without the structure constants
+            if len(left) == 0:
+                return self(right)
+            if len(right) == 0:
+                return self(left)
+            Sym = self.realization_of()
+            consts = Sym.structure_constants(self)
+            return self._from_dict(consts.product(left, right))
+
     class Monomial(Basis):
         """Class of the monomial basis."""
 
@@ -1444,7 +2194,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
 
     m = Monomial
 
-    class Schur(Basis):
+    class Schur(NonMultiplicativeBasis):
         """Class of the type I super Schur."""
 
         def __init__(self, A):
@@ -1567,7 +2317,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     for spart, coeff in spart_coeff.iteritems()]
                 return sum(new_exprs)
 
-    class SchurBar(Basis):
+    class SchurBar(NonMultiplicativeBasis):
         """Class of the type II super Schur."""
 
         def __init__(self, A):
@@ -1596,7 +2346,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     for spart, coeff in spart_coeff.iteritems()]
                 return sum(new_exprs)
 
-    class SchurStar(Basis):
+    class SchurStar(NonMultiplicativeBasis):
         """Class of the type I dual super Schur."""
 
         def __init__(self, A):
@@ -1687,7 +2437,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     for spart, coeff in spart_coeff.iteritems()]
                 return sum(new_exprs)
 
-    class SchurBarStar(Basis):
+    class SchurBarStar(NonMultiplicativeBasis):
         """Class of the type II dual super Schur."""
 
         def __init__(self, A):
@@ -1738,9 +2488,9 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                 self, A, prefix='p')
 
         def _rho_qt_spart(self, spart):
-            BR = self.base_ring()
             P = self
-            q, t, _ = BR.gens()
+            q, t = [self.realization_of()._parameter(name)
+                    for name in ['q', 't']]
             bosonic = P(_Superpartitions([[], list(spart[1])]))
             bosonic = bosonic.omega_qt()
 
@@ -1786,8 +2536,8 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
                     coeff = reduce(operator.mul, coeff, 1)
                     return coeff
 
-                t = self.base_ring().gens_dict()['t']
                 P = self.parent()
+                t = P.realization_of()._parameter('t')
 
                 spart_coeff = self.monomial_coefficients()
                 spart_phicoeff = {
@@ -1848,7 +2598,7 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
 
     gqt = Gqt
 
-    class Jack(Basis):
+    class Jack(NonMultiplicativeBasis):
         """ Class for the Jack superpolynomials. """
 
         def __init__(self, A):
@@ -1877,51 +2627,184 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             norm = alpha_factor*reduce(operator.mul, hooks, 1)
             return norm
 
-        def _gram_sector(self, n, m):
+        def _gram_sector(self, n, m, **options):
             """Apply Gram Schmidt to solve for the sector."""
+            return dict(self._gram_sector_rows(n, m, **options))
+
+        def _gram_sector_rows(self, n, m, targets=None, known=None,
+                              **options):
+            """Yield the rows of the sector as they are orthogonalized."""
             Sym = self.realization_of()
             mono = Sym.Monomial()
-            alpha = self.base_ring().gens_dict()['alpha']
-            cache = Sym._gram_schmidt(n, m, mono,
-                                      lambda sp: part_scalar_jack(sp, sp,
-                                                                  alpha),
-                                      upper_triangular=True)
+            alpha = Sym._parameter('alpha')
+            return Sym._gram_schmidt_rows(
+                n, m, mono, lambda sp: part_scalar_jack(sp, sp, alpha),
+                upper_triangular=True,
+                norm=lambda sp: self.calc_norm(sp, param=alpha),
+                targets=targets, known=known, **options)
+
+        @cached_method
+        def _eigen_operators(self, sector):
+            """Return the operators D and Delta on the monomials of sector."""
+            r"""
+            Each operator is given by columns, as a dict
+            {spart: {spart: coeff}}, see ``eigenoperators.py``.
+            """
+            Sym = self.realization_of()
+            BR = self.base_ring()
+            alpha = Sym._parameter('alpha')
+            sparts = Sym.sector_superpartitions(sector)
+            ranks = Sym._sector_ranks(sector)
+            to_p = Sym.transition_matrix('Monomial', 'Powersum', sector)
+            from_p = Sym.transition_matrix('Powersum', 'Monomial', sector)
+            out = []
+            for on_powersum in [D_on_powersum, Delta_on_powersum]:
+                entries = {}
+                for row, spart in enumerate(sparts):
+                    for other, coeff in on_powersum(spart, alpha).items():
+                        entries[(row, ranks[other])] = coeff
+                op_p = Matrix(BR, len(sparts), len(sparts), entries,
+                              sparse=True)
+                cols = {spart: {} for spart in sparts}
+                for (row, col), coeff in (to_p*op_p*from_p).dict().items():
+                    cols[sparts[col]][sparts[row]] = coeff
+                out.append(cols)
+            return tuple(out)
+
+        def _eigen_sector(self, n, m, targets=None):
+            """Compute Jacks as eigenfunctions of D and Delta."""
+            r"""
+            The eigenproblem is triangular on the monomial basis and is
+            solved by back-substitution, without scalar products. With
+            ``targets=None`` the whole sector is computed and the result
+            is the same dict as ``_gram_sector``, otherwise only the
+            superpartitions of ``targets`` are, each one on its
+            dominance down-set. Return ``None`` if the spectrum of the
+            operators is degenerate, which happens for some values of a
+            specialized `\alpha`.
+            """
+            Sym = self.realization_of()
+            sector = (n, m)
+            D_cols, Delta_cols = self._eigen_operators(sector)
+            order = _Superpartitions.sort_by_dominance(
+                list(Sym.sector_superpartitions(sector)))
+            order.reverse()
+            whole_sector = targets is None
+            targets = set(order if whole_sector else targets)
+            zero = self.base_ring().zero()
+            cache = {}
+            for i, spart in enumerate(order):
+                if spart not in targets:
+                    continue
+                down_set = [other for other in order[:i] if other < spart]
+                try:
+                    coeffs = eigen_row(spart, down_set, D_cols, Delta_cols,
+                                       self.base_ring().one())
+                except ValueError:
+                    print("The spectrum of D and Delta is degenerate in "
+                          "the sector " + str(sector) + ".")
+                    return None
+                keys = order[:i+1] if whole_sector else down_set + [spart]
+                cache[spart] = {key: coeffs.get(key, zero) for key in keys}
             return cache
 
+        def _interpolate_sector(self, n, m, **options):
+            """Compute the sector by evaluation and interpolation in alpha."""
+            r"""
+            The sector is orthogonalized over `\QQ` (or modulo primes with
+            ``modular=True``) for `\alpha = 1, 2, \dots` in a process pool
+            and every coefficient is interpolated, see
+            ``interpolation.py`` for the options. Return the same dict as
+            ``_gram_sector``, or ``None`` if the interpolation does not
+            stabilize.
+            """
+            Sym = self.realization_of()
+            BR = self.base_ring()
+            sector = (n, m)
+            sparts = Sym.sector_superpartitions(sector)
+            R = QQ['alpha']
+            alpha = R.gen()
+            weights = [alpha**len(sp)*sp.z_lambda() for sp in sparts]
+            to_p = rational_constants(Sym.transition_matrix(
+                'Monomial', 'Powersum', sector, output='dict'))
+            print("Interpolating the sector " + str(sector) + "...")
+            fracs = interpolate_sector(sector, to_p, weights, R, **options)
+            if fracs is None:
+                print("The interpolation did not stabilize.")
+                return None
+            cache = {}
+            for (row, col), (num, den) in fracs.items():
+                coeff = to_ring(num, BR) / to_ring(den, BR)
+                cache.setdefault(sparts[row], {})[sparts[col]] = coeff
+            return cache
+
+        @cached_method
+        def evaluator(self):
+            """Return the batch evaluator of the basis, X being N."""
+            alpha = self.realization_of()._parameter('alpha')
+            return BatchEvaluator(
+                self.base_ring(),
+                lambda spart, X: jack_factor(spart, X, alpha),
+                lambda N, point: N)
+
+        def evaluate_sector(self, sector, Ns, points=None):
+            """Return the matrix of the evaluations of a sector."""
+            r"""
+            The rows are the superpartitions of
+            ``sector_superpartitions(sector)``, the columns are the numbers
+            of variables ``Ns``, repeated for every dict {'alpha': value}
+            of ``points`` if given.
+            """
+            evaluator = self.evaluator()
+            sparts = self.realization_of().sector_superpartitions(sector)
+            return evaluator.values(evaluator.sector_polynomials(sparts),
+                                    Ns, points)
+
+        def float_sector(self, n, m, alpha=None, method='mgs',
+                         tolerance=1e-12):
+            """Return the sector approximated in floating point."""
+            r"""
+            ``alpha`` is a number, by default the value of the parameter
+            of a specialized algebra. See ``numeric_backend.py`` for the
+            methods ``'mgs'`` and ``'qr'``; the result is a
+            ``FloatSector`` indexed by the ranks of the superpartitions.
+            """
+            Sym = self.realization_of()
+            if alpha is None:
+                alpha = Sym._parameter('alpha')
+            return Sym._float_sector(
+                (n, m), lambda sparts: jack_weights(sparts, alpha),
+                method=method, tolerance=tolerance)
+
+        def float_errors(self, n, m, alpha=None, **options):
+            """Return the errors of float_sector against the exact rows."""
+            r"""
+            Return the largest absolute and relative errors on the
+            coefficients. This is meant for the small sectors, whose
+            exact rows can be computed.
+            """
+            Sym = self.realization_of()
+            approx = self.float_sector(n, m, alpha=alpha, **options)
+            point = {} if alpha is None else {'alpha': alpha}
+            return Sym._float_errors('Jack_m', approx, point)
+
         class Element(CombinatorialFreeModule.Element):
             """Jack element class."""
 
             def evaluation(self, NbVars):
-                BR = self.base_ring()
-                alpha = BR.gens_dict()['alpha']
-
-                def _eval_spart(spart, N, alpha):
-                    BLambda = spart.bosonic_cells()
-                    hooks = [spart.lower_hook_length(i, j, alpha)
-                             for i, j in BLambda]
-                    vlambda = reduce(operator.mul, hooks, 1)
-
-                    ferm_deg = spart.fermionic_degree()
-                    delta_m = _Superpartitions([[], range(ferm_deg, 0, -1)])
-                    delta_m_coords = delta_m.cells()
-
-                    spart_CS = _Superpartitions([[],
-                                                 list(spart.circle_star())])
-                    coords = spart_CS.cells()
-                    deltaLambda = [coord
-                                   for coord in coords
-                                   if coord not in delta_m_coords]
-                    second_prod = [N - (i - 1) + alpha*(j - 1)
-                                   for (i, j) in deltaLambda]
-                    second_prod = reduce(operator.mul, second_prod, 1)
-                    return second_prod/vlambda
-
-                spart_coef = self.monomial_coefficients().items()
-                terms = [coef*_eval_spart(spart, NbVars, alpha)
-                         for spart, coef in spart_coef]
-                return reduce(operator.add, terms)
-
-    class Macdonald(Basis):
+                """Return the evaluation at x_1 = ... = x_NbVars = 1."""
+                evaluator = self.parent().evaluator()
+                return evaluator.element_polynomial(self)(NbVars)
+
+            def evaluations(self, Ns, points=None):
+                """Return the list of the evaluations for every N in Ns."""
+                r"""
+                ``points`` is an optional list of dicts {'alpha': value},
+                the values are then given point by point.
+                """
+                return self.parent().evaluator().evaluate(self, Ns, points)
+
+    class Macdonald(NonMultiplicativeBasis):
         """Class for the Macdonald superpolynomials."""
 
         def __init__(self, A):
@@ -1929,15 +2812,106 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             SymSuperfunctionsAlgebra.Basis.__init__(
                 self, A, prefix='Pqt')
 
-        def _gram_sector(self, n, m):
+        def _gram_sector(self, n, m, **options):
             """Apply GramSchmidt to solve for whole sector."""
+            return dict(self._gram_sector_rows(n, m, **options))
+
+        def _gram_sector_rows(self, n, m, targets=None, known=None,
+                              **options):
+            """Yield the rows of the sector as they are orthogonalized."""
+            Sym = self.realization_of()
+            mono = Sym.Monomial()
+            q, t = [Sym._parameter('q'), Sym._parameter('t')]
+            return Sym._gram_schmidt_rows(
+                n, m, mono, lambda sp: mono.z_lambda_qt(sp, (q, t)),
+                upper_triangular=True,
+                norm=lambda sp: self.calc_norm(sp, param=(q, t)),
+                targets=targets, known=known, **options)
+
+        def _modular_sector(self, n, m, **options):
+            """Compute the sector by modular evaluation and interpolation."""
+            r"""
+            See ``macdonald_modular.py`` for the method and the options.
+            Return the same dict as ``_gram_sector``, or ``None`` if the
+            interpolation fails.
+            """
             Sym = self.realization_of()
+            BR = self.base_ring()
             mono = Sym.Monomial()
-            params = self.base_ring().gens_dict()
-            q, t = [params['q'], params['t']]
-            cache = Sym._gram_schmidt(n, m, mono,
-                                      lambda sp: mono.z_lambda_qt(sp, (q, t)),
-                                      upper_triangular=True)
+            sector = (n, m)
+            sparts = Sym.sector_superpartitions(sector)
+            ranks = Sym._sector_ranks(sector)
+            order = _Superpartitions.sort_by_dominance(list(sparts))
+            order.reverse()
+            R = QQ['q', 't']
+            q, t = R.gens()
+            hooks = [R(self.monomial(sp).hlo_Lambda(q, t, sp))
+                     for sp in sparts]
+            degrees = (max(h.degree(q) for h in hooks),
+                       max(h.degree(t) for h in hooks))
+            weight_data = [(sp[0].degree(), list(sp[1]), mono.z_lambda(sp))
+                           for sp in sparts]
+            to_p = rational_constants(Sym.transition_matrix(
+                'Monomial', 'Powersum', sector, output='dict'))
+            print("Interpolating the sector " + str(sector) + "...")
+            polys = modular_macdonald_sector(
+                [ranks[sp] for sp in order], to_p, weight_data,
+                [{tuple(e): c for e, c in h.dict().items()} for h in hooks],
+                degrees, **options)
+            if polys is None:
+                print("The modular interpolation failed.")
+                return None
+            cache = {}
+            for (row, col), poly in polys.items():
+                hook = to_ring(hooks[ranks[order[row]]], BR)
+                coeff = to_ring(R(poly), BR) / hook
+                cache.setdefault(order[row], {})[order[col]] = coeff
+            return cache
+
+        def _ns_sector(self, n, m, targets=None, processes=None):
+            """Compute the sector from the non-symmetric Macdonald."""
+            r"""
+            Each superpolynomial is obtained by the Hecke symmetrization
+            of one non-symmetric Macdonald polynomial, in a process pool,
+            see ``ns_macdonald.py``. With ``targets=None`` the whole
+            sector is computed and the result is the same dict as
+            ``_gram_sector``, otherwise only the superpartitions of
+            ``targets`` are, on their dominance down-set. Return ``None``
+            if a coefficient breaks the triangularity.
+            """
+            Sym = self.realization_of()
+            q, t = [Sym._parameter('q'), Sym._parameter('t')]
+            sector = (n, m)
+            sparts = Sym.sector_superpartitions(sector)
+            N = max(len(sp) for sp in sparts)
+            order = _Superpartitions.sort_by_dominance(list(sparts))
+            order.reverse()
+            whole_sector = targets is None
+            targets = set(order if whole_sector else targets)
+            rows = []
+            for i, spart in enumerate(order):
+                if spart not in targets:
+                    continue
+                if whole_sector:
+                    keys = order[:i+1]
+                else:
+                    keys = [other for other in order[:i] if other < spart]
+                    keys.append(spart)
+                rows.append((spart, keys))
+
+            def as_pair(sp):
+                return (tuple(sp[0]), tuple(sp[1]))
+            coeffs = ns_macdonald_rows(
+                [(as_pair(spart), [as_pair(key) for key in keys])
+                 for spart, keys in rows], N, q, t, processes=processes)
+            cache = {}
+            for (spart, keys), row in zip(rows, coeffs):
+                for key, coeff in zip(keys, row):
+                    if coeff != 0 and key != spart and not key < spart:
+                        print("The non-symmetric construction is not "
+                              "triangular.")
+                        return None
+                cache[spart] = dict(zip(keys, row))
             return cache
 
         @staticmethod
@@ -1948,6 +2922,8 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             if param == 'qt':
                 QQqt = QQ['q', 't'].fraction_field()
                 q, t = QQqt.gens()
+            elif isinstance(param, tuple) and len(param) == 2:
+                q, t = param
             else:
                 raise ValueError("Innapropriate coefficient ring.")
             coords = spart.bosonic_cells()
@@ -1969,6 +2945,60 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
             norm = prefactor*reduce(operator.mul, terms, 1)
             return norm
 
+        @cached_method
+        def evaluator(self):
+            """Return the batch evaluator of the basis, X being t^N."""
+            Sym = self.realization_of()
+            q, t = [Sym._parameter('q'), Sym._parameter('t')]
+            return BatchEvaluator(
+                self.base_ring(),
+                lambda spart, X: macdonald_factor(spart, X, q, t),
+                lambda N, point: point.get('t', t)**N)
+
+        def evaluate_sector(self, sector, Ns, points=None):
+            """Return the matrix of the specializations of a sector."""
+            r"""
+            The rows are the superpartitions of
+            ``sector_superpartitions(sector)``, the columns are the numbers
+            of variables ``Ns``, repeated for every dict {'q': value,
+            't': value} of ``points`` if given.
+            """
+            evaluator = self.evaluator()
+            sparts = self.realization_of().sector_superpartitions(sector)
+            return evaluator.values(evaluator.sector_polynomials(sparts),
+                                    Ns, points)
+
+        def float_sector(self, n, m, q=None, t=None, method='mgs',
+                         tolerance=1e-12):
+            """Return the sector approximated in floating point."""
+            r"""
+            ``q`` and ``t`` are numbers, by default the values of the
+            parameters of a specialized algebra. See ``numeric_backend.py``
+            for the methods ``'mgs'`` and ``'qr'``; the result is a
+            ``FloatSector`` indexed by the ranks of the superpartitions.
+            """
+            Sym = self.realization_of()
+            if q is None:
+                q = Sym._parameter('q')
+            if t is None:
+                t = Sym._parameter('t')
+            return Sym._float_sector(
+                (n, m), lambda sparts: macdonald_weights(sparts, q, t),
+                method=method, tolerance=tolerance)
+
+        def float_errors(self, n, m, q=None, t=None, **options):
+            """Return the errors of float_sector against the exact rows."""
+            r"""
+            Return the largest absolute and relative errors on the
+            coefficients. This is meant for the small sectors, whose
+            exact rows can be computed.
+            """
+            Sym = self.realization_of()
+            approx = self.float_sector(n, m, q=q, t=t, **options)
+            point = {name: value for name, value in [('q', q), ('t', t)]
+                     if value is not None}
+            return Sym._float_errors('Macdo_m', approx, point)
+
         class Element(CombinatorialFreeModule.Element):
             """Class for methods on elements of Macdonald basis."""
 
@@ -1996,46 +3026,17 @@ class SymSuperfunctionsAlgebra(UniqueRepresentation, Parent):
 
             def specialize(self, N, P_norm=True):
                 """Specialize the sMacdo."""
-                BR = self.base_ring()
-                params = BR.gens_dict()
-                q = params['q']
-                t = params['t']
-                wqt = self.hlo_Lambda
-                # This pretty much goes as is illustrated in the compendium
-
-                def _eval_spart(spart, wqt, N, q, t):
-                    ferm_deg = spart.fermionic_degree()
-                    stair = _Superpartitions.stair(ferm_deg - 1)
-                    stairplus = _Superpartitions.stair(ferm_deg)
-
-                    zetaL = spart.zeta()
-                    bSL = spart.circle_star().b() - stairplus.b()
-                    exp_denom = (
-                        (ferm_deg - 1)*(spart[0].degree() - stair.degree()) -
-                        (spart[0].b() - stair.b()))
-                    normp = wqt(q, t, spart)
-
-                    term1 = (t**(zetaL) * t**(bSL)) / (q**(exp_denom))
-                    term1 = (1/normp)*term1
-
-                    stair = stairplus
-                    stair = _Superpartitions([[], list(stair)])
-                    stair_cells = stair.cells()
-                    csCells = spart.circle_star().cells()
-                    SLambda_cells = [s
-                                     for s in csCells
-                                     if s not in stair_cells]
-
-                    terms2 = [1 - q**(j-1)*t**(N-(i-1))
-                              for i, j in SLambda_cells]
-                    term2 = reduce(operator.mul, terms2, 1)
-
-                    return term1 * term2
-
-                spart_coef = self.monomial_coefficients().items()
-                terms = [coef*_eval_spart(spart, wqt, N, q, t)
-                         for spart, coef in spart_coef]
-                return reduce(operator.add, terms)
+                t = self.parent().realization_of()._parameter('t')
+                evaluator = self.parent().evaluator()
+                return evaluator.element_polynomial(self)(t**N)
+
+            def specializations(self, Ns, points=None):
+                """Return the list of the specializations for every N."""
+                r"""
+                ``points`` is an optional list of dicts {'q': value,
+                't': value}, the values are then given point by point.
+                """
+                return self.parent().evaluator().evaluate(self, Ns, points)
 
 
 # Deprecating